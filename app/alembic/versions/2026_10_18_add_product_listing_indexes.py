@@ -0,0 +1,63 @@
+"""add_product_listing_indexes
+
+Revision ID: 5c1e9b7d3a40
+Revises: 220e7fb1f822
+Create Date: 2026-10-18 16:21:07.482913
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "5c1e9b7d3a40"
+down_revision: Union[str, Sequence[str], None] = "220e7fb1f822"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        op.f("ix_products_category_price"),
+        "products",
+        ["category", "price"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_products_category_name"),
+        "products",
+        ["category", "name"],
+        unique=False,
+    )
+    op.create_index(op.f("ix_products_price"), "products", ["price"], unique=False)
+    op.create_index(
+        op.f("ix_products_created_at"), "products", ["created_at"], unique=False
+    )
+    op.create_index(
+        op.f("ix_products_description_trgm"),
+        "products",
+        ["description"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"description": "gin_trgm_ops"},
+    )
+    # a prefix of both composite indexes
+    op.drop_index(op.f("ix_products_category"), table_name="products")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        op.f("ix_products_category"), "products", ["category"], unique=False
+    )
+    op.drop_index(
+        op.f("ix_products_description_trgm"),
+        table_name="products",
+        postgresql_using="gin",
+        postgresql_ops={"description": "gin_trgm_ops"},
+    )
+    op.drop_index(op.f("ix_products_created_at"), table_name="products")
+    op.drop_index(op.f("ix_products_price"), table_name="products")
+    op.drop_index(op.f("ix_products_category_name"), table_name="products")
+    op.drop_index(op.f("ix_products_category_price"), table_name="products")
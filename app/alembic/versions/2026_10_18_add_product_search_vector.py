@@ -0,0 +1,52 @@
+"""add_product_search_vector
+
+Revision ID: a87a413cce1d
+Revises: 6a08fb54906f
+Create Date: 2026-10-18 12:14:37.208113
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "a87a413cce1d"
+down_revision: Union[str, Sequence[str], None] = "6a08fb54906f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "products",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', name), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        op.f("ix_products_search_vector"),
+        "products",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f("ix_products_search_vector"),
+        table_name="products",
+        postgresql_using="gin",
+    )
+    op.drop_column("products", "search_vector")
@@ -0,0 +1,54 @@
+"""add_product_trigram_indexes
+
+Revision ID: 220e7fb1f822
+Revises: a87a413cce1d
+Create Date: 2026-10-18 15:02:51.730446
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "220e7fb1f822"
+down_revision: Union[str, Sequence[str], None] = "a87a413cce1d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        op.f("ix_products_category_trgm"),
+        "products",
+        ["category"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"category": "gin_trgm_ops"},
+    )
+    op.create_index(
+        op.f("ix_products_name_trgm"),
+        "products",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f("ix_products_name_trgm"),
+        table_name="products",
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.drop_index(
+        op.f("ix_products_category_trgm"),
+        table_name="products",
+        postgresql_using="gin",
+        postgresql_ops={"category": "gin_trgm_ops"},
+    )
+    # the extension stays, other objects may have come to depend on it
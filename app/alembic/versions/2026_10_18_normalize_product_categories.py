@@ -0,0 +1,131 @@
+"""normalize_product_categories
+
+Revision ID: 9d2f4a61c8e5
+Revises: 5c1e9b7d3a40
+Create Date: 2026-10-18 17:43:12.905127
+
+"""
+
+import re
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "9d2f4a61c8e5"
+down_revision: Union[str, Sequence[str], None] = "5c1e9b7d3a40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# a copy of the model's, the migration must not change with it
+def category_slug(name: str) -> str:
+    return re.sub(r"[\W_]+", "-", name.casefold()).strip("-")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    categories = op.create_table(
+        "categories",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("slug", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_categories")),
+        sa.UniqueConstraint("name", name=op.f("uq_categories_name")),
+        sa.UniqueConstraint("slug", name=op.f("uq_categories_slug")),
+    )
+    op.add_column("products", sa.Column("category_id", sa.Integer(), nullable=True))
+
+    # one category per slug, named after the first of its spellings
+    connection = op.get_bind()
+    names = connection.execute(
+        sa.text("SELECT DISTINCT category FROM products ORDER BY category")
+    ).scalars()
+    names_by_slug: dict[str, list[str]] = {}
+    for name in names:
+        names_by_slug.setdefault(category_slug(name), []).append(name)
+
+    if names_by_slug:
+        op.bulk_insert(
+            categories,
+            [
+                {"name": spellings[0], "slug": slug}
+                for slug, spellings in names_by_slug.items()
+            ],
+        )
+        ids = dict(connection.execute(sa.text("SELECT slug, id FROM categories")))
+        connection.execute(
+            sa.text("UPDATE products SET category_id = :id WHERE category = :name"),
+            [
+                {"id": ids[slug], "name": name}
+                for slug, spellings in names_by_slug.items()
+                for name in spellings
+            ],
+        )
+
+    op.alter_column("products", "category_id", nullable=False)
+    op.create_foreign_key(
+        op.f("fk_products_category_id_categories"),
+        "products",
+        "categories",
+        ["category_id"],
+        ["id"],
+    )
+    op.create_index(
+        op.f("ix_products_category_id_price"),
+        "products",
+        ["category_id", "price"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_products_category_id_name"),
+        "products",
+        ["category_id", "name"],
+        unique=False,
+    )
+    op.drop_index(op.f("ix_products_category_name"), table_name="products")
+    op.drop_index(op.f("ix_products_category_price"), table_name="products")
+    op.drop_index(
+        op.f("ix_products_category_trgm"),
+        table_name="products",
+        postgresql_using="gin",
+        postgresql_ops={"category": "gin_trgm_ops"},
+    )
+    op.drop_column("products", "category")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column("products", sa.Column("category", sa.String(), nullable=True))
+    op.execute(
+        "UPDATE products SET category = categories.name "
+        "FROM categories WHERE categories.id = products.category_id"
+    )
+    op.alter_column("products", "category", nullable=False)
+    op.create_index(
+        op.f("ix_products_category_trgm"),
+        "products",
+        ["category"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"category": "gin_trgm_ops"},
+    )
+    op.create_index(
+        op.f("ix_products_category_price"),
+        "products",
+        ["category", "price"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_products_category_name"),
+        "products",
+        ["category", "name"],
+        unique=False,
+    )
+    op.drop_index(op.f("ix_products_category_id_name"), table_name="products")
+    op.drop_index(op.f("ix_products_category_id_price"), table_name="products")
+    op.drop_constraint(
+        op.f("fk_products_category_id_categories"), "products", type_="foreignkey"
+    )
+    op.drop_column("products", "category_id")
+    op.drop_table("categories")
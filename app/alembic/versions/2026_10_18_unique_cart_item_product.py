@@ -0,0 +1,49 @@
+"""unique_cart_item_product
+
+Revision ID: 3b7e0c5f92d1
+Revises: 9d2f4a61c8e5
+Create Date: 2026-10-18 18:36:40.118592
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "3b7e0c5f92d1"
+down_revision: Union[str, Sequence[str], None] = "9d2f4a61c8e5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # lines of the same product in a cart are merged into one with their sum
+    op.execute(
+        "UPDATE cart_items SET quantity = totals.quantity "
+        "FROM ("
+        "SELECT cart_id, product_id, sum(quantity) AS quantity FROM cart_items "
+        "GROUP BY cart_id, product_id HAVING count(*) > 1"
+        ") AS totals "
+        "WHERE cart_items.cart_id = totals.cart_id "
+        "AND cart_items.product_id = totals.product_id"
+    )
+    op.execute(
+        "DELETE FROM cart_items USING cart_items AS kept "
+        "WHERE cart_items.cart_id = kept.cart_id "
+        "AND cart_items.product_id = kept.product_id "
+        "AND cart_items.id > kept.id"
+    )
+    op.create_unique_constraint(
+        op.f("uq_cart_items_cart_id_product_id"),
+        "cart_items",
+        ["cart_id", "product_id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # merged lines stay merged
+    op.drop_constraint(
+        op.f("uq_cart_items_cart_id_product_id"), "cart_items", type_="unique"
+    )
@@ -0,0 +1,118 @@
+"""Cost of reading a large cart through the schemas and as database-rendered JSON.
+
+Seeds a catalog and one cart holding ``--items`` of its products in a
+transaction that is rolled back afterwards, then reads the cart both ways down
+to the response body bytes. Wall time includes the database, which does the
+rendering in the JSON mode; CPU time is the client's share.
+
+Run from the ``app`` directory against a migrated database::
+
+    python -m benchmarks.cart_json --items 500
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from benchmarks.query_plans import seed_catalog
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from src.database import db_manager
+from src.features.cart.model import Cart, CartItem
+from src.features.cart.repo import CartItemRepository, CartRepository
+from src.features.cart.schema import CartRead
+from src.features.cart.service import CartService
+from src.features.cart.store import DatabaseCartStore
+from src.features.product.model import Product
+
+DEFAULT_ITEMS = 500
+NUMBER = 100
+SESSION_ID = "benchmark"
+
+
+async def seed_cart(connection: AsyncConnection, items: int) -> None:
+    cart_id = (
+        await connection.execute(
+            insert(Cart)
+            .values(id=func.gen_random_uuid(), session_id=SESSION_ID)
+            .returning(Cart.id)
+        )
+    ).scalar_one()
+    await connection.execute(
+        insert(CartItem).from_select(
+            [CartItem.id, CartItem.product_id, CartItem.cart_id, CartItem.quantity],
+            select(
+                func.gen_random_uuid(),
+                Product.id,
+                literal(cart_id, CartItem.cart_id.type),
+                literal(2),
+            ).limit(items),
+        )
+    )
+
+
+async def schema_body(service: CartService) -> bytes:
+    # roughly what FastAPI does with the result for ``response_model=CartRead``
+    cart = await service.get_cart_items(session_id=SESSION_ID)
+    validated = CartRead.model_validate(cart)
+    return validated.model_dump_json(by_alias=True).encode()
+
+
+async def database_body(service: CartService) -> bytes:
+    return await service.get_cart_json(session_id=SESSION_ID)
+
+
+async def measure(
+    name: str,
+    connection: AsyncConnection,
+    read: Callable[[CartService], Awaitable[bytes]],
+) -> None:
+    async def request() -> bytes:
+        # a session per read, like a session per request
+        async with AsyncSession(bind=connection) as session:
+            carts = CartRepository(session=session)
+            store = DatabaseCartStore(
+                carts=carts, items=CartItemRepository(session=session)
+            )
+            return await read(CartService(repo=carts, store=store))
+
+    size = len(await request())
+
+    started, started_cpu = time.perf_counter(), time.process_time()
+    for _ in range(NUMBER):
+        await request()
+    per_read = (time.perf_counter() - started) / NUMBER * 1000
+    per_read_cpu = (time.process_time() - started_cpu) / NUMBER * 1000
+
+    print(
+        f"{name:<20} {per_read:8.2f} ms wall  {per_read_cpu:8.2f} ms CPU"
+        f"  {size / 1024:8.0f} KiB"
+    )
+
+
+async def run(items: int) -> None:
+    db_manager.initialize()
+    try:
+        async with db_manager.engine.connect() as connection:
+            async with connection.begin() as transaction:
+                await seed_catalog(connection, items)
+                await seed_cart(connection, items)
+                print(f"{items} items per cart, {NUMBER} reads")
+
+                await measure("schemas", connection, schema_body)
+                await measure("database JSON", connection, database_body)
+                await transaction.rollback()
+    finally:
+        await db_manager.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=DEFAULT_ITEMS)
+    args = parser.parse_args()
+    asyncio.run(run(args.items))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Query plans of every ``list_products`` filter and sort combination.
+
+Seeds a synthetic catalog in a transaction that is rolled back afterwards, runs
+``EXPLAIN (FORMAT JSON)`` of the page query of each combination the product
+filters produce and reports the plans that read products without an index or
+cost more than the budget. Exact totals count every match by design, so the
+page query is the one ``total_mode=estimate|none`` sends.
+
+Run from the ``app`` directory against a migrated database::
+
+    python -m benchmarks.query_plans --rows 100000 --budget 2500
+
+The exit status is 1 when a plan fails.
+"""
+
+import argparse
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import Numeric, String, cast, func, insert, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from src.cache import TTLCache
+from src.database import db_manager
+from src.features.cart.model import Cart, CartItem  # noqa: F401
+from src.features.product.model import Category, Product
+from src.features.product.repo import CategoryRepository, ProductRepository
+from src.features.product.service import ProductService
+from src.repo.explain import Explain, load_plan
+
+DEFAULT_ROWS = 100_000
+DEFAULT_BUDGET = 2500.0
+PAGE_SIZE = 20
+
+# the seeded catalog has CATEGORIES categories and VOCABULARY distinct item
+# words, the filters below match about 1% of it or less
+CATEGORIES = 200
+VOCABULARY = 500
+
+SEARCHES: dict[str, dict[str, Any]] = {
+    "no search": {},
+    "substring search": {"search": "item042", "search_mode": "substring"},
+    "fulltext search": {"search": "item042", "search_mode": "fulltext"},
+    "fuzzy search": {"search": "item042", "search_mode": "fuzzy"},
+}
+CATEGORY_FILTERS: dict[str, dict[str, Any]] = {
+    "any category": {},
+    "category contains": {"category": "category-017", "category_match": "contains"},
+    "category exact": {"category": "category-017", "category_match": "exact"},
+    "category fuzzy": {"category": "category-017", "category_match": "fuzzy"},
+}
+PRICE_FILTERS: dict[str, dict[str, Any]] = {
+    "any price": {},
+    "price from": {"price_from": 990},
+    "price to": {"price_to": 10},
+    "price range": {"price_from": 500, "price_to": 510},
+}
+SORTS: dict[str, dict[str, Any]] = {
+    "default order": {"sort_by": None, "sort_order": "asc"},
+    "price asc": {"sort_by": "price", "sort_order": "asc"},
+    "price desc": {"sort_by": "price", "sort_order": "desc"},
+    "name asc": {"sort_by": "name", "sort_order": "asc"},
+    "name desc": {"sort_by": "name", "sort_order": "desc"},
+}
+
+INDEX_NODE_TYPES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+@dataclass(frozen=True)
+class PlanCase:
+    name: str
+    filters: dict[str, Any]
+    sort_by: Optional[str]
+    sort_order: str
+
+
+@dataclass
+class PlanResult:
+    case: PlanCase
+    cost: float
+    indexes: set[str] = field(default_factory=set)
+    seq_scan: bool = False
+    failures: list[str] = field(default_factory=list)
+
+
+def iter_cases() -> Iterator[PlanCase]:
+    for names in itertools.product(SEARCHES, CATEGORY_FILTERS, PRICE_FILTERS, SORTS):
+        search, category, price, sort = names
+        yield PlanCase(
+            name=", ".join(names),
+            filters={
+                **SEARCHES[search],
+                **CATEGORY_FILTERS[category],
+                **PRICE_FILTERS[price],
+            },
+            **SORTS[sort],
+        )
+
+
+async def seed_catalog(connection: AsyncConnection, rows: int) -> None:
+    """Insert the categories and ``rows`` synthetic products and analyze the tables."""
+    categories = (
+        func.generate_series(0, CATEGORIES - 1).table_valued("n").render_derived()
+    )
+    name = func.concat("category-", func.lpad(cast(categories.c.n, String), 3, "0"))
+    await connection.execute(
+        insert(Category).from_select(
+            [Category.name, Category.slug],
+            select(name, name).select_from(categories),
+        )
+    )
+
+    series = func.generate_series(1, rows).table_valued("i").render_derived()
+    i = series.c.i
+    item = func.concat("item", func.lpad(cast(i % VOCABULARY, String), 3, "0"))
+    category = func.concat("category-", func.lpad(cast(i % CATEGORIES, String), 3, "0"))
+    created_at = func.now() - i * literal_column("interval '1 second'")
+
+    await connection.execute(
+        insert(Product).from_select(
+            [
+                Product.id,
+                Product.name,
+                Product.description,
+                Product.price,
+                Product.category_id,
+                Product.created_at,
+                Product.updated_at,
+            ],
+            select(
+                func.gen_random_uuid(),
+                func.concat("product ", i, " ", item),
+                func.concat("Synthetic ", item, " of ", category),
+                cast(i * 7919 % 100_000, Numeric(10, 2)) / 100,
+                Category.id,
+                created_at,
+                created_at,
+            ).join_from(series, Category, Category.slug == category),
+        )
+    )
+    # the planner only knows about the new rows once the tables are analyzed
+    await connection.exec_driver_sql("ANALYZE categories, products")
+
+
+async def explain_cases(
+    connection: AsyncConnection,
+    budget: float = DEFAULT_BUDGET,
+) -> list[PlanResult]:
+    """Plan of the page query of every case, checked against the rules."""
+    # the session joins the connection's transaction, to resolve the seeded
+    # categories of ``exact`` category filters; they are rolled back, so they
+    # must not reach the process's category cache
+    session = AsyncSession(bind=connection)
+    categories = CategoryRepository(session=session)
+    categories.by_slug = TTLCache(maxsize=CATEGORIES, ttl=3600)
+    service = ProductService(
+        repo=ProductRepository(session=session),
+        categories=categories,
+    )
+
+    results = []
+    for case in iter_cases():
+        conditions = await service._get_product_conditions(**case.filters)
+        order_by, _ = service._build_order_by(
+            search=case.filters.get("search"),
+            search_mode=case.filters.get("search_mode", "substring"),
+            sort_by=case.sort_by,  # type: ignore[arg-type]
+            sort_order=case.sort_order,  # type: ignore[arg-type]
+        )
+        statement, params = service.repo._get_select_statement(
+            conditions=conditions,
+            order_by=order_by,
+        )
+        statement = statement.limit(PAGE_SIZE)
+
+        raw = (await connection.execute(Explain(statement), params)).scalar_one()
+        results.append(check_plan(case, load_plan(raw), budget))
+    return results
+
+
+def check_plan(case: PlanCase, plan: dict[str, Any], budget: float) -> PlanResult:
+    result = PlanResult(case=case, cost=plan["Total Cost"])
+    for node in _iter_nodes(plan):
+        if node.get("Relation Name", "products") != "products":
+            continue
+        if node["Node Type"] in INDEX_NODE_TYPES:
+            result.indexes.add(node["Index Name"])
+        elif node["Node Type"] == "Seq Scan":
+            result.seq_scan = True
+
+    if result.seq_scan or not result.indexes:
+        result.failures.append("reads products without an index")
+    if result.cost > budget:
+        result.failures.append(f"costs {result.cost:.0f}, over {budget:.0f}")
+    return result
+
+
+def _iter_nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _iter_nodes(child)
+
+
+def format_report(results: list[PlanResult]) -> str:
+    lines = []
+    for result in results:
+        status = "; ".join(result.failures) or "ok"
+        indexes = ", ".join(sorted(result.indexes)) or "-"
+        lines.append(
+            f"{result.cost:10.1f}  {status:<40} {indexes:<60} {result.case.name}"
+        )
+    return "\n".join(lines)
+
+
+async def run(rows: int, budget: float) -> list[PlanResult]:
+    db_manager.initialize()
+    try:
+        async with db_manager.engine.connect() as connection:
+            async with connection.begin() as transaction:
+                await seed_catalog(connection, rows)
+                results = await explain_cases(connection, budget)
+                await transaction.rollback()
+    finally:
+        await db_manager.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET)
+    parser.add_argument(
+        "--failures-only", action="store_true", help="only list failing plans"
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.rows, args.budget))
+    failed = [result for result in results if result.failures]
+    print(format_report(failed if args.failures_only else results))
+    print(f"\n{len(failed)} of {len(results)} plans failed")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Cost of loading a product list page as ORM instances and as read-only rows.
+
+Seeds a catalog in a transaction that is rolled back afterwards, then loads
+and serializes the same page both ways. CPU time is the client's share of a
+page, the database does the same work in both modes; memory is the peak of
+allocations while one page is loaded and serialized.
+
+Run from the ``app`` directory against a migrated database::
+
+    python -m benchmarks.row_mode
+"""
+
+import asyncio
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Sequence
+
+from benchmarks.query_plans import seed_catalog
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from src.database import db_manager
+from src.features.product.repo import CategoryRepository, ProductRepository
+from src.features.product.schema import ProductRead
+from src.features.product.service import ProductService
+
+PAGE_SIZE = 200
+NUMBER = 200
+
+
+async def measure(
+    name: str,
+    connection: AsyncConnection,
+    load: Callable[[ProductService], Awaitable[Sequence[Any]]],
+) -> None:
+    async def page() -> None:
+        # a session per page, like a session per request
+        async with AsyncSession(bind=connection) as session:
+            service = ProductService(
+                repo=ProductRepository(session=session),
+                categories=CategoryRepository(session=session),
+            )
+            for item in await load(service):
+                ProductRead.model_validate(item)
+
+    await page()
+
+    started = time.process_time()
+    for _ in range(NUMBER):
+        await page()
+    per_page = (time.process_time() - started) / NUMBER * 1000
+
+    tracemalloc.start()
+    await page()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<20} {per_page:8.2f} ms CPU  {peak / 1024:8.0f} KiB peak")
+
+
+async def run() -> None:
+    db_manager.initialize()
+    try:
+        async with db_manager.engine.connect() as connection:
+            async with connection.begin() as transaction:
+                await seed_catalog(connection, PAGE_SIZE)
+                print(f"{PAGE_SIZE} products per page, {NUMBER} pages")
+
+                await measure(
+                    "ORM instances",
+                    connection,
+                    lambda service: service.repo.list(limit=PAGE_SIZE, offset=0),
+                )
+                await measure(
+                    "read-only rows",
+                    connection,
+                    lambda service: service.repo.list_rows(
+                        service.list_columns, limit=PAGE_SIZE, offset=0
+                    ),
+                )
+                await transaction.rollback()
+    finally:
+        await db_manager.dispose()
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Python cost of building repository statements with and without the shape cache.
+
+Run from the ``app`` directory::
+
+    python -m benchmarks.statement_cache
+"""
+
+import timeit
+from typing import Any, Callable
+
+from src.features.cart.model import Cart, CartItem  # noqa: F401
+from src.features.product.model import Product
+from src.features.product.repo import ProductRepository
+
+NUMBER = 20_000
+
+
+class UncachedProductRepository(ProductRepository):
+    statement_cache_size = 0
+
+
+def measure(name: str, call: Callable[[], Any]) -> float:
+    per_call = timeit.timeit(call, number=NUMBER) / NUMBER * 1_000_000
+    print(f"{name:<40} {per_call:8.2f} us")
+    return per_call
+
+
+def main() -> None:
+    for repo_class in (UncachedProductRepository, ProductRepository):
+        repo = repo_class(session=None)  # type: ignore[arg-type]
+        print(repo_class.__name__)
+
+        measure(
+            "list page, category filter",
+            lambda: repo._get_select_statement(
+                conditions=[Product.price >= 10],
+                order_by=[Product.price.desc()],
+                category="books",
+            ),
+        )
+        measure(
+            "get_one by id",
+            lambda: repo._get_select_statement(order_by=[], id=1),
+        )
+        measure(
+            "count, category filter",
+            lambda: repo._get_count_statement(category="books"),
+        )
+        print()
+
+    repo = ProductRepository(session=None)  # type: ignore[arg-type]
+    measure(
+        "error messages merged per call",
+        lambda: repo._get_error_messages(default_messages=repo.error_messages),
+    )
+    measure("error messages resolved once", lambda: repo._resolve_error_messages())
+
+
+if __name__ == "__main__":
+    main()
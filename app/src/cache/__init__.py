@@ -0,0 +1,6 @@
+__all__ = (
+    "CacheStats",
+    "TTLCache",
+)
+
+from .memory import CacheStats, TTLCache
@@ -0,0 +1,72 @@
+import hashlib
+from collections.abc import Callable
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple, Optional
+
+from fastapi import Request, Response, status
+
+
+class Versioned[T](NamedTuple):
+    """Validators of a representation and how to build it, once they missed."""
+
+    build: Callable[[], T]
+    etag: str
+
+
+def make_etag(*parts: object) -> str:
+    """Strong ETag of the parts' string forms, which must identify the representation."""
+    digest = hashlib.sha1("\x1f".join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    *,
+    etag: str,
+    last_modified: Optional[datetime],
+    cache_control: str,
+) -> Optional[Response]:
+    """Empty ``304 Not Modified`` when the client's copy is current, else ``None``.
+
+    Either way the validators and ``Cache-Control`` are set, on the 304 or on
+    ``response`` for the full body the endpoint goes on to return.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if _is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+def _is_not_modified(
+    request: Request,
+    etag: str,
+    last_modified: Optional[datetime],
+) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored when If-None-Match is present
+        candidates = {
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        }
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+
+    # Last-Modified only has a resolution of one second
+    return last_modified.replace(microsecond=0) <= since
@@ -1,3 +1,4 @@
+import os
 from typing import List
 
 
@@ -12,3 +13,30 @@ class CORSConfig:
 
 
 cors_config = CORSConfig()
+
+
+class InstrumentationConfig:
+    repository_stats: bool = os.getenv("REPOSITORY_STATS", "false").lower() == "true"
+
+
+instrumentation_config = InstrumentationConfig()
+
+
+class HTTPCacheConfig:
+    product_cache_control: str = os.getenv("PRODUCT_CACHE_CONTROL", "public, no-cache")
+
+
+http_cache_config = HTTPCacheConfig()
+
+
+class CartStoreConfig:
+    # "database" keeps carts in Postgres only; "memory" serves active carts from
+    # process memory and writes them behind, which needs every request of a
+    # session to reach the same worker process
+    backend: str = os.getenv("CART_STORE", "database")
+    max_carts: int = int(os.getenv("CART_STORE_MAX_CARTS", 10_000))
+    flush_interval: float = float(os.getenv("CART_STORE_FLUSH_INTERVAL", 1.0))
+    flush_batch_size: int = int(os.getenv("CART_STORE_FLUSH_BATCH_SIZE", 200))
+
+
+cart_store_config = CartStoreConfig()
@@ -3,8 +3,10 @@ from typing import TYPE_CHECKING
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from src.repo.exceptions import (
+    BulkOperationError,
     DuplicateKeyError,
     IntegrityError,
+    InvalidCursorError,
     NotFoundError,
     RepositoryError,
 )
@@ -13,6 +15,26 @@ if TYPE_CHECKING:
     from fastapi import FastAPI
 
 
+async def bulk_operation_exception_handler(
+    request: Request,
+    exc: BulkOperationError,
+):
+    all_duplicates = all(
+        isinstance(error, DuplicateKeyError) for _, error in exc.errors
+    )
+    return JSONResponse(
+        status_code=(
+            status.HTTP_409_CONFLICT if all_duplicates else status.HTTP_400_BAD_REQUEST
+        ),
+        content={
+            "detail": str(exc),
+            "errors": [
+                {"index": index, "detail": str(error)} for index, error in exc.errors
+            ],
+        },
+    )
+
+
 async def duplicate_key_exception_handler(
     request: Request,
     exc: DuplicateKeyError,
@@ -33,6 +55,16 @@ async def integrity_exception_handler(
     )
 
 
+async def invalid_cursor_exception_handler(
+    request: Request,
+    exc: InvalidCursorError,
+):
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": str(exc)},
+    )
+
+
 async def not_found_exception_handler(
     request: Request,
     exc: NotFoundError,
@@ -54,7 +86,9 @@ async def repository_exception_handler(
 
 
 def register_exception_handlers(app: "FastAPI"):
+    app.add_exception_handler(BulkOperationError, bulk_operation_exception_handler)
     app.add_exception_handler(DuplicateKeyError, duplicate_key_exception_handler)
     app.add_exception_handler(IntegrityError, integrity_exception_handler)
+    app.add_exception_handler(InvalidCursorError, invalid_cursor_exception_handler)
     app.add_exception_handler(NotFoundError, not_found_exception_handler)
     app.add_exception_handler(RepositoryError, repository_exception_handler)
@@ -1,23 +1,40 @@
 from typing import Annotated
 
 from fastapi import Depends
+from src.config import cart_store_config
 from src.database import SessionDep
 
 from .repo import CartItemRepository, CartRepository
 from .service import CartItemService, CartService
+from .store import CartStore, DatabaseCartStore, hot_cart_store
 
 
-def get_cart_service(session: SessionDep) -> CartService:
+def get_cart_store(session: SessionDep) -> CartStore:
+    if cart_store_config.backend == "memory":
+        return hot_cart_store
+    return DatabaseCartStore(
+        carts=CartRepository(session=session),
+        items=CartItemRepository(session=session),
+    )
+
+
+CartStoreDep = Annotated[CartStore, Depends(get_cart_store)]
+
+
+def get_cart_service(session: SessionDep, store: CartStoreDep) -> CartService:
     repo = CartRepository(session=session)
-    return CartService(repo=repo)
+    return CartService(repo=repo, store=store)
 
 
 CartServiceDep = Annotated[CartService, Depends(get_cart_service)]
 
 
-def get_cart_item_service(session: SessionDep) -> CartItemService:
+def get_cart_item_service(
+    session: SessionDep,
+    store: CartStoreDep,
+) -> CartItemService:
     repo = CartItemRepository(session=session)
-    return CartItemService(repo=repo)
+    return CartItemService(repo=repo, store=store)
 
 
 CartItemServiceDep = Annotated[CartItemService, Depends(get_cart_item_service)]
@@ -1,7 +1,7 @@
 from typing import TYPE_CHECKING, List
 from uuid import UUID
 
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import ForeignKey, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.model import Base
 from src.model.mixins import UUIDPrimaryKey
@@ -19,6 +19,9 @@ class Cart(Base, UUIDPrimaryKey):
 
 
 class CartItem(Base, UUIDPrimaryKey):
+    # a product has one line per cart, adding it again raises the quantity
+    __table_args__ = (UniqueConstraint("cart_id", "product_id"),)
+
     product_id: Mapped[UUID] = mapped_column(ForeignKey("products.id"))
     cart_id: Mapped[UUID] = mapped_column(ForeignKey("carts.id"))
     quantity: Mapped[int]
@@ -1,7 +1,37 @@
-from typing import Optional
+from collections.abc import Callable, Mapping
+from itertools import batched
+from typing import Any, Optional, Sequence
+from uuid import UUID, uuid4
 
+from sqlalchemy import (
+    JSON,
+    ColumnElement,
+    Delete,
+    Double,
+    Row,
+    Text,
+    Update,
+    any_,
+    bindparam,
+    cast,
+    delete,
+    exists,
+    func,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
+from src.features.product.model import Category, Product
 from src.repo import BaseRepository
-from src.repo.exceptions import ErrorMessages, wrap_sqlalchemy_exception
+from src.repo.exceptions import (
+    ErrorMessages,
+    NotFoundError,
+    wrap_sqlalchemy_exception,
+)
+from src.repo.instrumentation import instrumented
 
 from .constant import CART_ERROR_MESSAGES, CART_ITEM_ERROR_MESSAGES
 from .model import Cart, CartItem
@@ -11,23 +41,360 @@ class CartRepository(BaseRepository[Cart]):
     model = Cart
     error_messages = CART_ERROR_MESSAGES
 
+    @instrumented
+    async def get_contents(
+        self,
+        session_id: str,
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> Sequence[Row[Any]]:
+        """The session's cart, its items and their products in one query.
+
+        One row per item, a cart without items is a single row with a ``NULL``
+        ``item_id`` and there are no rows without a cart. Every row carries the
+        cart's ``total_price``, summed by the database.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            total_price = func.sum(Product.price * CartItem.quantity).over()
+            statement = (
+                select(
+                    Cart.id.label("cart_id"),
+                    func.coalesce(total_price, 0).label("total_price"),
+                    CartItem.id.label("item_id"),
+                    CartItem.quantity,
+                    Product.id.label("product_id"),
+                    Product.name,
+                    Product.description,
+                    Product.price,
+                    Product.image,
+                    Category.name.label("category"),
+                )
+                .select_from(Cart)
+                .outerjoin(CartItem, CartItem.cart_id == Cart.id)
+                .outerjoin(Product, Product.id == CartItem.product_id)
+                .outerjoin(Category, Category.id == Product.category_id)
+                .where(Cart.session_id == session_id)
+                .order_by(CartItem.id)
+            )
+            result = await self._execute(statement)
+            return result.all()
+
+    @instrumented
+    async def get_contents_json(
+        self,
+        session_id: str,
+        alias: Callable[[str], str] = str,
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> Optional[str]:
+        """The session's cart as a JSON document rendered by the database.
+
+        The document holds what ``get_contents`` returns, nested like
+        ``CartRead``; ``alias`` maps its field names to the document's keys.
+        ``None`` when there is no cart.
+        """
+
+        def json_object(**values: Any) -> ColumnElement[Any]:
+            return func.json_build_object(
+                *(part for key, value in values.items() for part in (alias(key), value))
+            )
+
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            item = json_object(
+                id=CartItem.id,
+                quantity=CartItem.quantity,
+                product=json_object(
+                    id=Product.id,
+                    name=Product.name,
+                    description=Product.description,
+                    price=cast(Product.price, Double),
+                    image=Product.image,
+                    category=Category.name,
+                ),
+            )
+            items = func.json_agg(aggregate_order_by(item, CartItem.id)).filter(
+                CartItem.id.is_not(None)
+            )
+            document = json_object(
+                id=Cart.id,
+                session_id=Cart.session_id,
+                total_price=cast(
+                    func.coalesce(func.sum(Product.price * CartItem.quantity), 0),
+                    Double,
+                ),
+                items=func.coalesce(items, cast(literal("[]"), JSON)),
+            )
+            statement = (
+                select(cast(document, Text))
+                .select_from(Cart)
+                .outerjoin(CartItem, CartItem.cart_id == Cart.id)
+                .outerjoin(Product, Product.id == CartItem.product_id)
+                .outerjoin(Category, Category.id == Product.category_id)
+                .where(Cart.session_id == session_id)
+                .group_by(Cart.id)
+            )
+            result = await self._execute(statement)
+            return result.scalar_one_or_none()
+
+    @instrumented
+    async def list_lines(
+        self,
+        session_ids: Sequence[str],
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> Sequence[Row[Any]]:
+        """The sessions' carts with the id, product and quantity of their items.
+
+        One row per item, a cart without items is a single row with a ``NULL``
+        ``item_id`` and there are no rows for sessions without a cart.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            session_ids_param = bindparam(
+                "session_ids", list(session_ids), type_=ARRAY(Cart.session_id.type)
+            )
+            statement = (
+                select(
+                    Cart.session_id,
+                    Cart.id.label("cart_id"),
+                    CartItem.id.label("item_id"),
+                    CartItem.product_id,
+                    CartItem.quantity,
+                )
+                .select_from(Cart)
+                .outerjoin(CartItem, CartItem.cart_id == Cart.id)
+                .where(Cart.session_id == any_(session_ids_param))
+            )
+            result = await self._execute(statement)
+            return result.all()
+
+    @instrumented
+    async def save_contents(
+        self,
+        contents: Mapping[str, tuple[UUID, Sequence[tuple[UUID, UUID, int]]]],
+        *,
+        auto_commit: Optional[bool] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> dict[str, UUID]:
+        """Make the sessions' carts hold exactly the given lines.
+
+        ``contents`` maps a session id to the id its cart gets if it is created
+        and the cart's ``(item_id, product_id, quantity)`` lines. The carts are
+        upserted, their items that are not among the lines are deleted and the
+        lines are upserted by id. Returns the id of each session's cart, the
+        existing one when the cart was already there.
+        """
+        if not contents:
+            return {}
+
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            cart_insert = pg_insert(Cart).values(
+                [
+                    {"id": cart_id, "session_id": session_id}
+                    for session_id, (cart_id, _) in contents.items()
+                ]
+            )
+            # a no-op update instead of DO NOTHING, so existing ids are returned
+            result = await self._execute(
+                cart_insert.on_conflict_do_update(
+                    index_elements=[Cart.session_id],
+                    set_={"session_id": cart_insert.excluded.session_id},
+                ).returning(Cart.session_id, Cart.id)
+            )
+            cart_ids: dict[str, UUID] = dict(result.tuples().all())
+
+            rows = [
+                {
+                    "id": item_id,
+                    "cart_id": cart_ids[session_id],
+                    "product_id": product_id,
+                    "quantity": quantity,
+                }
+                for session_id, (_, lines) in contents.items()
+                for item_id, product_id, quantity in lines
+            ]
+            cart_ids_param = bindparam(
+                "cart_ids", list(cart_ids.values()), type_=ARRAY(CartItem.cart_id.type)
+            )
+            item_ids_param = bindparam(
+                "item_ids", [row["id"] for row in rows], type_=ARRAY(CartItem.id.type)
+            )
+            # first, so no other line of a product is left to clash with
+            await self._execute(
+                delete(CartItem).where(
+                    CartItem.cart_id == any_(cart_ids_param),
+                    ~(CartItem.id == any_(item_ids_param)),
+                )
+            )
+            for chunk in batched(rows, self.bulk_chunk_size):
+                item_insert = pg_insert(CartItem).values(list(chunk))
+                await self._execute(
+                    item_insert.on_conflict_do_update(
+                        index_elements=[CartItem.id],
+                        set_={"quantity": item_insert.excluded.quantity},
+                    )
+                )
+
+            await self._flush_or_commit(auto_commit=auto_commit)
+            return cart_ids
+
 
 class CartItemRepository(BaseRepository[CartItem]):
     model = CartItem
     error_messages = CART_ITEM_ERROR_MESSAGES
 
-    async def delete(
+    @instrumented
+    async def add_to_cart(
         self,
-        cart_item: CartItem,
+        session_id: str,
+        product_id: UUID,
+        quantity: int,
         *,
         auto_commit: Optional[bool] = None,
         error_messages: Optional[ErrorMessages | None] = None,
-    ) -> None:
-        error_messages = self._get_error_messages(
-            error_messages=error_messages,
-            default_messages=self.error_messages,
-        )
+    ) -> CartItem | None:
+        """Add ``quantity`` of a product to the session's cart in one statement.
 
+        The cart is upserted by ``session_id`` in a CTE and the item is upserted
+        on ``(cart_id, product_id)``, an existing line gets the quantity added.
+        Concurrent calls for a new session end up in the same cart. ``None``
+        when the product doesn't exist, nothing is written then.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
         with wrap_sqlalchemy_exception(error_messages=error_messages):
-            await self.session.delete(cart_item)
+            # only for an existing product, a missing one must not create a cart
+            cart_insert = pg_insert(Cart).from_select(
+                [Cart.id, Cart.session_id],
+                select(
+                    literal(uuid4(), Cart.id.type),
+                    literal(session_id, Cart.session_id.type),
+                ).where(exists().where(Product.id == product_id)),
+            )
+            # a no-op update instead of DO NOTHING, so the existing id is returned
+            cart = (
+                cart_insert.on_conflict_do_update(
+                    index_elements=[Cart.session_id],
+                    set_={"session_id": cart_insert.excluded.session_id},
+                )
+                .returning(Cart.id)
+                .cte("cart")
+            )
+
+            item_insert = pg_insert(CartItem).from_select(
+                [CartItem.id, CartItem.product_id, CartItem.cart_id, CartItem.quantity],
+                select(
+                    literal(uuid4(), CartItem.id.type),
+                    Product.id,
+                    cart.c.id,
+                    literal(quantity, CartItem.quantity.type),
+                ).where(Product.id == product_id),
+            )
+            statement = (
+                item_insert.on_conflict_do_update(
+                    index_elements=[CartItem.cart_id, CartItem.product_id],
+                    set_={
+                        "quantity": CartItem.quantity + item_insert.excluded.quantity
+                    },
+                )
+                .returning(CartItem)
+                .add_cte(cart)
+                .execution_options(populate_existing=True)
+            )
+
+            instance = (await self._execute(statement)).scalar_one_or_none()
+
+            await self._flush_or_commit(auto_commit=auto_commit)
+            if instance is not None:
+                self._after_write([instance])
+            return instance
+
+    @instrumented
+    async def update_in_cart(
+        self,
+        session_id: str,
+        item_id: UUID,
+        quantity: int,
+        *,
+        auto_commit: Optional[bool] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> CartItem | None:
+        """Set the quantity of an item of the session's cart in one statement.
+
+        ``None`` when the item belongs to another cart, which is left as it is;
+        raises ``NotFoundError`` when there is no such item at all.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            statement = (
+                update(CartItem)
+                .where(CartItem.id == item_id, self._in_cart(session_id))
+                .values(quantity=quantity)
+            )
+            instance = await self._write_in_cart(statement, item_id)
+
+            await self._flush_or_commit(auto_commit=auto_commit)
+            if instance is not None:
+                self._after_write([instance])
+            return instance
+
+    @instrumented
+    async def delete_from_cart(
+        self,
+        session_id: str,
+        item_id: UUID,
+        *,
+        auto_commit: Optional[bool] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> CartItem | None:
+        """Delete an item of the session's cart in one statement.
+
+        ``None`` when the item belongs to another cart, which is left as it is;
+        raises ``NotFoundError`` when there is no such item at all.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            statement = delete(CartItem).where(
+                CartItem.id == item_id, self._in_cart(session_id)
+            )
+            instance = await self._write_in_cart(statement, item_id)
+            # the row is gone, the instance only describes it
+            if instance is not None:
+                self.session.expunge(instance)
+
             await self._flush_or_commit(auto_commit=auto_commit)
+            if instance is not None:
+                self._after_write([instance])
+            return instance
+
+    @staticmethod
+    def _in_cart(session_id: str) -> ColumnElement[bool]:
+        return (
+            CartItem.cart_id
+            == select(Cart.id).where(Cart.session_id == session_id).scalar_subquery()
+        )
+
+    async def _write_in_cart(
+        self,
+        statement: Update | Delete,
+        item_id: UUID,
+    ) -> CartItem | None:
+        """Run a write scoped to a cart and tell a missing item from a foreign one.
+
+        The write runs in a CTE joined to the item's row as it was before the
+        statement, which every part of it sees: no row means there is no such
+        item, a row without the written item means it is in another cart.
+        """
+        written = statement.returning(*CartItem.__table__.c).cte("written")
+        written_item = aliased(CartItem, written)
+
+        result = await self._execute(
+            select(CartItem.id, written_item)
+            .outerjoin(written_item, written_item.id == CartItem.id)
+            .where(CartItem.id == item_id)
+            .execution_options(populate_existing=True)
+        )
+        row = result.one_or_none()
+        if row is None:
+            msg = "No item found when one was expected"
+            raise NotFoundError(msg)
+        return row[1]
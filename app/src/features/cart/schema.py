@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import PositiveInt
@@ -25,7 +25,8 @@ class CartItemRead(BaseSchema):
 
 
 class CartRead(BaseSchema):
-    id: UUID
+    # None until something is added to the session's cart
+    id: Optional[UUID] = None
     session_id: str
     total_price: float
     items: List[CartItemRead]
@@ -1,12 +1,16 @@
+from typing import Literal
 from uuid import UUID
 
-from sqlalchemy.orm import selectinload
-from src.features.product.schema import ProductRead
+from src.features.product.constant import PRODUCT_ERROR_MESSAGES
+from src.repo.exceptions import wrap_sqlalchemy_exception
 from src.service import BaseService
 
 from .model import Cart, CartItem
 from .repo import CartItemRepository, CartRepository
-from .schema import CartCreate, CartItemCreate, CartItemRead, CartRead
+from .schema import CartCreate, CartItemCreate, CartItemUpdate, CartRead
+from .store import CartStore
+
+RenderMode = Literal["python", "database"]
 
 
 class CartService(
@@ -16,37 +20,21 @@ class CartService(
         Cart,
     ]
 ):
-    async def add(self, session_id: str) -> Cart:
-        instance = self.model(session_id=session_id)
-        return await self.repo.add(
-            instance,
-            auto_commit=True,
-        )
-
-    async def get_one(self, **kwargs) -> Cart:
-        load_options = [selectinload(Cart.items).selectinload(CartItem.product)]
-        return await self.repo.get_one(load_options=load_options, **kwargs)
-
-    async def get_one_or_none(self, **kwargs) -> Cart:
-        return await self.repo.get_one_or_none(**kwargs)
+    def __init__(self, repo: CartRepository, store: CartStore) -> None:
+        super().__init__(repo)
+        self.store = store
 
     async def get_cart_items(self, *, session_id: str) -> CartRead:
-        cart = await self.get_one(session_id=session_id)
-        total_price = sum(item.product.price * item.quantity for item in cart.items)
+        return await self.store.get_cart(session_id)
 
-        return CartRead(
-            id=cart.id,
-            session_id=cart.session_id,
-            total_price=float(total_price),
-            items=[
-                CartItemRead(
-                    id=item.id,
-                    quantity=item.quantity,
-                    product=ProductRead.model_validate(item.product),
-                )
-                for item in cart.items
-            ],
-        )
+    async def get_cart_json(self, *, session_id: str) -> bytes:
+        """``get_cart_items`` as ``CartRead`` JSON.
+
+        The database store has Postgres render it, skipping the schema objects
+        whose building and validation dominates the request time of large carts;
+        numbers come as the database prints them.
+        """
+        return await self.store.get_cart_json(session_id)
 
 
 class CartItemService(
@@ -56,16 +44,29 @@ class CartItemService(
         CartItem,
     ]
 ):
-    async def add(self, data: CartItemCreate, cart_id: UUID) -> CartItem:
-        instance = self.model(**data.model_dump(), cart_id=cart_id)
-        return await self.repo.add(
-            instance,
-            auto_commit=True,
-        )
+    def __init__(self, repo: CartItemRepository, store: CartStore) -> None:
+        super().__init__(repo)
+        self.store = store
+
+    async def add_to_cart(self, *, session_id: str, data: CartItemCreate) -> CartItem:
+        item = await self.store.add_item(session_id, data.product_id, data.quantity)
+        # only a missing product keeps the item from being added
+        with wrap_sqlalchemy_exception(error_messages=PRODUCT_ERROR_MESSAGES):
+            return self.repo.check_not_found(item)
 
-    async def update(self, *, item: CartItem) -> CartItem:
-        return await self.repo.update(item, auto_commit=True)
+    async def update_in_cart(
+        self,
+        *,
+        session_id: str,
+        item_id: UUID,
+        data: CartItemUpdate,
+    ) -> CartItem | None:
+        return await self.store.update_item(session_id, item_id, data.quantity)
 
-    async def delete_item_by_id(self, *, item_id: UUID) -> None:
-        item = await self.repo.get_one(id=item_id)
-        await self.repo.delete(item, auto_commit=True)
+    async def delete_from_cart(
+        self,
+        *,
+        session_id: str,
+        item_id: UUID,
+    ) -> CartItem | None:
+        return await self.store.delete_item(session_id, item_id)
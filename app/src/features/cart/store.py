@@ -0,0 +1,531 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Sequence
+from contextlib import suppress
+from decimal import Decimal
+from itertools import batched, chain
+from typing import TYPE_CHECKING, NamedTuple, Optional, cast
+from uuid import UUID, uuid4
+
+from src.config import cart_store_config
+from src.features.product.model import Product
+from src.features.product.repo import ProductRepository
+from src.features.product.schema import ProductRead
+from src.repo.exceptions import (
+    IntegrityError,
+    RepositoryError,
+    wrap_sqlalchemy_exception,
+)
+from src.service import BatchLoader
+
+from .constant import CART_ITEM_ERROR_MESSAGES
+from .model import Cart, CartItem
+from .repo import CartItemRepository, CartRepository
+from .schema import CartItemRead, CartRead
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# a cart that fails this many writes while other carts are written is dropped
+MAX_WRITE_ATTEMPTS = 3
+
+
+class CartStore(ABC):
+    """Where ``CartService`` and ``CartItemService`` keep the carts of sessions.
+
+    Item writes return the written item, ``None`` for a missing product when
+    adding and for an item of another cart when updating or deleting; a
+    missing item raises ``NotFoundError``.
+    """
+
+    @abstractmethod
+    async def get_cart(self, session_id: str) -> CartRead: ...
+
+    @abstractmethod
+    async def get_cart_json(self, session_id: str) -> bytes: ...
+
+    @abstractmethod
+    async def add_item(
+        self,
+        session_id: str,
+        product_id: UUID,
+        quantity: int,
+    ) -> Optional[CartItem]: ...
+
+    @abstractmethod
+    async def update_item(
+        self,
+        session_id: str,
+        item_id: UUID,
+        quantity: int,
+    ) -> Optional[CartItem]: ...
+
+    @abstractmethod
+    async def delete_item(
+        self, session_id: str, item_id: UUID
+    ) -> Optional[CartItem]: ...
+
+
+class DatabaseCartStore(CartStore):
+    """Carts read from and written to Postgres by every call, in the request's session."""
+
+    def __init__(self, carts: CartRepository, items: CartItemRepository) -> None:
+        self.carts = carts
+        self.items = items
+
+    async def get_cart(self, session_id: str) -> CartRead:
+        # a session without a cart reads as an empty one, nothing is written
+        rows = await self.carts.get_contents(session_id)
+        if not rows:
+            return empty_cart(session_id)
+
+        return CartRead(
+            id=rows[0].cart_id,
+            session_id=session_id,
+            total_price=float(rows[0].total_price),
+            items=[
+                CartItemRead(
+                    id=row.item_id,
+                    quantity=row.quantity,
+                    product=ProductRead(
+                        id=row.product_id,
+                        name=row.name,
+                        description=row.description,
+                        price=row.price,
+                        image=row.image,
+                        category=row.category,
+                    ),
+                )
+                for row in rows
+                if row.item_id is not None
+            ],
+        )
+
+    async def get_cart_json(self, session_id: str) -> bytes:
+        document = await self.carts.get_contents_json(
+            session_id,
+            alias=CartRead.model_config["alias_generator"],
+        )
+        if document is None:
+            return empty_cart(session_id).model_dump_json(by_alias=True).encode()
+        return document.encode()
+
+    async def add_item(
+        self,
+        session_id: str,
+        product_id: UUID,
+        quantity: int,
+    ) -> Optional[CartItem]:
+        return await self.items.add_to_cart(
+            session_id, product_id, quantity, auto_commit=True
+        )
+
+    async def update_item(
+        self,
+        session_id: str,
+        item_id: UUID,
+        quantity: int,
+    ) -> Optional[CartItem]:
+        return await self.items.update_in_cart(
+            session_id, item_id, quantity, auto_commit=True
+        )
+
+    async def delete_item(self, session_id: str, item_id: UUID) -> Optional[CartItem]:
+        return await self.items.delete_from_cart(session_id, item_id, auto_commit=True)
+
+
+class CartLine(NamedTuple):
+    id: UUID
+    product_id: UUID
+    quantity: int
+
+
+class HotCart:
+    """A cart held in memory; ``version`` counts its changes."""
+
+    __slots__ = (
+        "session_id",
+        "id",
+        "lines",
+        "deleted",
+        "version",
+        "flushed_version",
+        "write_failures",
+    )
+
+    def __init__(self, session_id: str) -> None:
+        self.session_id = session_id
+        # None until the cart is stored or something is added to it
+        self.id: Optional[UUID] = None
+        # by product, a product has one line per cart
+        self.lines: dict[UUID, CartLine] = {}
+        # the version that deleted an item, until it is deleted in the database
+        self.deleted: dict[UUID, int] = {}
+        self.version = 0
+        self.flushed_version = 0
+        # failed writes since the last one that succeeded
+        self.write_failures = 0
+
+    @property
+    def dirty(self) -> bool:
+        return self.version != self.flushed_version
+
+    def find_line(self, item_id: UUID) -> Optional[CartLine]:
+        return next((line for line in self.lines.values() if line.id == item_id), None)
+
+
+class MemoryCartStore(CartStore):
+    """Active carts in process memory, written behind to ``carts``/``cart_items``.
+
+    At most ``max_carts`` carts are held, the least recently used one is
+    evicted first. Changed carts are written in batches of
+    ``flush_batch_size`` every ``flush_interval`` seconds, when a changed cart
+    is evicted and on ``dispose``; an evicted cart stays reachable until it is
+    written. A failed write is logged and retried by the next flush, a cart
+    that keeps failing while others are written is dropped.
+
+    Evicted carts count against ``max_carts`` until they are written, so while
+    writes fail a full store refuses new carts with ``RepositoryError``
+    instead of growing.
+
+    The held carts are the truth, a flush replaces what the database has for
+    them. So all requests of a session have to reach the same process; other
+    processes only see a change once it is flushed. One store per process,
+    shared by the coroutines of its event loop.
+    """
+
+    def __init__(
+        self,
+        max_carts: int,
+        flush_interval: float,
+        flush_batch_size: int,
+    ) -> None:
+        self.max_carts = max_carts
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+
+        self._carts: OrderedDict[str, HotCart] = OrderedDict()
+        # carts with changes that are not written yet, held or evicted
+        self._dirty: dict[str, HotCart] = {}
+        self._loader: BatchLoader[str, HotCart] = BatchLoader(self._load_carts)
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task[None]] = None
+
+    def initialize(self, session_factory: "async_sessionmaker[AsyncSession]") -> None:
+        self._session_factory = session_factory
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def dispose(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flusher
+            self._flusher = None
+        await self.flush()
+        self._carts.clear()
+
+    def __len__(self) -> int:
+        return len(self._carts)
+
+    async def get_cart(self, session_id: str) -> CartRead:
+        cart = await self._get_cart(session_id)
+        if cart is None:
+            return empty_cart(session_id)
+
+        lines = sorted(cart.lines.values(), key=lambda line: line.id)
+        products = await self._get_products([line.product_id for line in lines])
+
+        items = []
+        total_price = Decimal(0)
+        for line in lines:
+            product = products.get(line.product_id)
+            if product is None:
+                continue
+            total_price += product.price * line.quantity
+            items.append(
+                CartItemRead(
+                    id=line.id,
+                    quantity=line.quantity,
+                    product=ProductRead.model_validate(product),
+                )
+            )
+        return CartRead(
+            id=cart.id,
+            session_id=session_id,
+            total_price=float(total_price),
+            items=items,
+        )
+
+    async def get_cart_json(self, session_id: str) -> bytes:
+        # the database may not have the latest changes, the schemas render it
+        cart = await self.get_cart(session_id)
+        return cart.model_dump_json(by_alias=True).encode()
+
+    async def add_item(
+        self,
+        session_id: str,
+        product_id: UUID,
+        quantity: int,
+    ) -> Optional[CartItem]:
+        products = await self._get_products([product_id])
+        if product_id not in products:
+            return None
+
+        # the database refuses it right away, a flush only after the change
+        # was reported as done
+        max_length = Cart.__table__.c.session_id.type.length
+        if len(session_id) > max_length:
+            msg = f"Session id is longer than {max_length} characters"
+            raise IntegrityError(msg)
+
+        cart = cast("HotCart", await self._get_cart(session_id, create=True))
+        line = cart.lines.get(product_id)
+        if line is None:
+            line = CartLine(uuid4(), product_id, quantity)
+        else:
+            line = line._replace(quantity=line.quantity + quantity)
+        cart.lines[product_id] = line
+        return self._changed(cart, line)
+
+    async def update_item(
+        self,
+        session_id: str,
+        item_id: UUID,
+        quantity: int,
+    ) -> Optional[CartItem]:
+        cart = await self._get_cart(session_id)
+        line = cart.find_line(item_id) if cart is not None else None
+        if cart is None or line is None:
+            await self._check_item_exists(item_id)
+            return None
+
+        line = line._replace(quantity=quantity)
+        cart.lines[line.product_id] = line
+        return self._changed(cart, line)
+
+    async def delete_item(self, session_id: str, item_id: UUID) -> Optional[CartItem]:
+        cart = await self._get_cart(session_id)
+        line = cart.find_line(item_id) if cart is not None else None
+        if cart is None or line is None:
+            await self._check_item_exists(item_id)
+            return None
+
+        del cart.lines[line.product_id]
+        item = self._changed(cart, line)
+        cart.deleted[line.id] = cart.version
+        return item
+
+    async def flush(self) -> bool:
+        """Write every changed cart, held or evicted, in batches; ``False`` if one is left.
+
+        A failed batch is written again cart by cart, so a cart the database
+        rejects doesn't hold back the others; carts that failed before go
+        last. The flush stops when nothing could be written before the first
+        failure, the database is likely down then.
+        """
+        async with self._flush_lock:
+            carts = sorted(self._dirty.values(), key=lambda cart: cart.write_failures)
+            written = False
+            failed: list[HotCart] = []
+            for batch in batched(carts, self.flush_batch_size):
+                try:
+                    await self._write(batch)
+                    written = True
+                    continue
+                except Exception:
+                    logger.exception("Writing %d carts failed", len(batch))
+
+                for cart in batch:
+                    # a batch of one has failed alone already
+                    if len(batch) > 1:
+                        try:
+                            await self._write([cart])
+                            written = True
+                            continue
+                        except Exception:
+                            logger.exception(
+                                "Writing the cart of %r failed", cart.session_id
+                            )
+                    cart.write_failures += 1
+                    failed.append(cart)
+                    if not written:
+                        return False
+
+            for cart in failed:
+                if written and cart.write_failures >= MAX_WRITE_ATTEMPTS:
+                    self._drop(cart)
+            return not failed
+
+    async def _write(self, carts: Sequence[HotCart]) -> None:
+        # taken before the first await, changes made during the write are
+        # left for the next flush
+        versions = [cart.version for cart in carts]
+        contents = {
+            cart.session_id: (cart.id or uuid4(), list(cart.lines.values()))
+            for cart in carts
+        }
+
+        async with self._session_factory() as session:
+            cart_ids = await CartRepository(session=session).save_contents(
+                contents, auto_commit=True
+            )
+
+        for cart, version in zip(carts, versions):
+            # another process may have created the session's cart first
+            cart.id = cart_ids[cart.session_id]
+            cart.flushed_version = max(cart.flushed_version, version)
+            cart.write_failures = 0
+            cart.deleted = {
+                item_id: deleted_version
+                for item_id, deleted_version in cart.deleted.items()
+                if deleted_version > version
+            }
+            if not cart.dirty and self._dirty.get(cart.session_id) is cart:
+                del self._dirty[cart.session_id]
+
+    def _drop(self, cart: HotCart) -> None:
+        logger.error(
+            "Dropping the cart of %r with %d lines, it failed %d writes",
+            cart.session_id,
+            len(cart.lines),
+            cart.write_failures,
+        )
+        if self._dirty.get(cart.session_id) is cart:
+            del self._dirty[cart.session_id]
+        if self._carts.get(cart.session_id) is cart:
+            del self._carts[cart.session_id]
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    def _changed(self, cart: HotCart, line: CartLine) -> CartItem:
+        if cart.id is None:
+            cart.id = uuid4()
+        cart.version += 1
+        self._dirty[cart.session_id] = cart
+        if len(self._dirty) >= self.flush_batch_size:
+            self._wakeup.set()
+        return CartItem(
+            id=line.id,
+            cart_id=cart.id,
+            product_id=line.product_id,
+            quantity=line.quantity,
+        )
+
+    async def _get_cart(
+        self,
+        session_id: str,
+        create: bool = False,
+    ) -> Optional[HotCart]:
+        """The session's cart, loaded when it isn't held, as the most recently used.
+
+        A session without a stored cart gets a new one with ``create``, else
+        ``None`` and nothing is held for it, reads don't evict carts in use.
+        Nothing awaits between this returning and the caller's change, so the
+        cart it changes is the held one.
+        """
+        loaded: Optional[HotCart] = None
+        looked_up = False
+        while True:
+            # a concurrent call may have taken the session's cart meanwhile
+            cart = self._take(session_id) or loaded
+            if cart is None and not looked_up:
+                loaded = await self._loader.load(session_id)
+                looked_up = True
+                continue
+            if cart is None:
+                if not create:
+                    return None
+                cart = loaded = HotCart(session_id)
+
+            # a held or evicted unwritten cart is counted already
+            if (
+                session_id in self._carts
+                or session_id in self._dirty
+                or self._size() < self.max_carts
+            ):
+                self._carts[session_id] = cart
+                self._carts.move_to_end(session_id)
+                return cart
+
+            # the eviction awaits the write of changed carts, look again after
+            await self._evict()
+
+    def _take(self, session_id: str) -> Optional[HotCart]:
+        cart = self._carts.get(session_id)
+        if cart is not None:
+            self._carts.move_to_end(session_id)
+            return cart
+        # evicted, but its changes are not written yet
+        return self._dirty.get(session_id)
+
+    def _size(self) -> int:
+        """The held carts and the evicted ones that are not written yet."""
+        evicted = sum(1 for session_id in self._dirty if session_id not in self._carts)
+        return len(self._carts) + evicted
+
+    async def _evict(self) -> None:
+        while len(self._carts) >= self.max_carts:
+            self._carts.popitem(last=False)
+        # evicted changed carts only leave memory once they are written
+        if self._size() >= self.max_carts and not await self.flush():
+            raise RepositoryError("Carts can't be written, no more are held")
+
+    async def _load_carts(self, session_ids: Sequence[str]) -> dict[str, HotCart]:
+        async with self._session_factory() as session:
+            rows = await CartRepository(session=session).list_lines(session_ids)
+
+        # only stored carts, the loader has the others load as None
+        carts: dict[str, HotCart] = {}
+        for row in rows:
+            cart = carts.get(row.session_id)
+            if cart is None:
+                cart = carts[row.session_id] = HotCart(row.session_id)
+            cart.id = row.cart_id
+            if row.item_id is not None:
+                cart.lines[row.product_id] = CartLine(
+                    row.item_id, row.product_id, row.quantity
+                )
+        return carts
+
+    async def _get_products(self, product_ids: Sequence[UUID]) -> dict[UUID, Product]:
+        # mostly served by the products cache, a session only connects on misses
+        async with self._session_factory() as session:
+            products = await ProductRepository(session=session).list_by_ids(product_ids)
+        return {product.id: product for product in products}
+
+    async def _check_item_exists(self, item_id: UUID) -> None:
+        """Raise ``NotFoundError`` unless some cart has the item.
+
+        The held and unwritten carts are the truth for their items, whether the
+        database has them yet or still; it only answers for the other carts.
+        """
+        for cart in chain(self._carts.values(), self._dirty.values()):
+            if item_id in cart.deleted:
+                with wrap_sqlalchemy_exception(error_messages=CART_ITEM_ERROR_MESSAGES):
+                    CartItemRepository.check_not_found(None)
+            if cart.find_line(item_id) is not None:
+                return
+
+        async with self._session_factory() as session:
+            await CartItemRepository(session=session).get_one(id=item_id)
+
+
+def empty_cart(session_id: str) -> CartRead:
+    return CartRead(id=None, session_id=session_id, total_price=0, items=[])
+
+
+hot_cart_store = MemoryCartStore(
+    max_carts=cart_store_config.max_carts,
+    flush_interval=cart_store_config.flush_interval,
+    flush_batch_size=cart_store_config.flush_batch_size,
+)
@@ -9,3 +9,37 @@ PRODUCT_ERROR_MESSAGES: ErrorMessages = {
     "multiple_rows": "Multiple products were found when only one was expected",
     "other": "An unexpected error occurred while processing the product",
 }
+
+CATEGORY_ERROR_MESSAGES: ErrorMessages = {
+    "not_found": "Category not found",
+    "duplicate_key": "A category with this name already exists",
+    "integrity": "Category data is invalid",
+    "foreign_key": "Category references an invalid related resource",
+    "check_constraint": "Category data violates business rules",
+    "multiple_rows": "Multiple categories were found when only one was expected",
+    "other": "An unexpected error occurred while processing the category",
+}
+
+PRODUCT_SEARCH_CONFIG = "english"
+"""Text search configuration of ``Product.search_vector`` and its queries."""
+
+PRODUCT_FACETS_CACHE_TTL = 30.0
+"""Seconds a facets result is served from memory for the same filters."""
+
+PRODUCT_FACETS_CACHE_SIZE = 1024
+
+PRODUCT_EXACT_TOTAL_THRESHOLD = 1000
+"""Estimated totals below this are counted exactly in the ``estimate`` total mode."""
+
+PRODUCT_CACHE_TTL = 60.0
+"""Seconds a product looked up by id is served from memory."""
+
+PRODUCT_CACHE_SIZE = 10_000
+
+PRODUCT_LOOKUP_MAX_IDS = 200
+"""Most ids one ``POST /products/lookup`` may ask for."""
+
+CATEGORY_ID_CACHE_TTL = 300.0
+"""Seconds a category id resolved from its slug is served from memory."""
+
+CATEGORY_ID_CACHE_SIZE = 10_000
@@ -3,13 +3,14 @@ from typing import Annotated
 from fastapi import Depends
 from src.database import SessionDep
 
-from .repo import ProductRepository
+from .repo import CategoryRepository, ProductRepository
 from .service import ProductService
 
 
 def get_product_service(session: SessionDep) -> ProductService:
     repo = ProductRepository(session=session)
-    return ProductService(repo=repo)
+    categories = CategoryRepository(session=session)
+    return ProductService(repo=repo, categories=categories)
 
 
 ProductServiceDep = Annotated[ProductService, Depends(get_product_service)]
@@ -1,14 +1,79 @@
-from sqlalchemy import DECIMAL
-from sqlalchemy.dialects.postgresql import TEXT
-from sqlalchemy.orm import Mapped, mapped_column
+import re
+
+from sqlalchemy import DDL, DECIMAL, Computed, ForeignKey, Index, event, select
+from sqlalchemy.dialects.postgresql import TEXT, TSVECTOR
+from sqlalchemy.orm import Mapped, column_property, mapped_column
 from src.model import Base
-from src.model.mixins import AuditColumns, UUIDPrimaryKey
+from src.model.mixins import AuditColumns, INTPrimaryKey, UUIDPrimaryKey
+
+from .constant import PRODUCT_SEARCH_CONFIG
+
+
+def category_slug(name: str) -> str:
+    """Lookup key of a category name, ``Home & Garden`` becomes ``home-garden``."""
+    return re.sub(r"[\W_]+", "-", name.casefold()).strip("-")
+
+
+class Category(Base, INTPrimaryKey):
+    __tablename__ = "categories"
+
+    name: Mapped[str] = mapped_column(unique=True)
+    slug: Mapped[str] = mapped_column(unique=True)
 
 
 class Product(Base, UUIDPrimaryKey, AuditColumns):
+    __table_args__ = (
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        # trigram indexes serve ILIKE '%...%' and similarity (fuzzy) filters
+        Index(
+            "ix_products_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_products_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+        # a category page sorted by price or name reads its rows in order, the
+        # category alone is served by their prefix
+        Index("ix_products_category_id_price", "category_id", "price"),
+        Index("ix_products_category_id_name", "category_id", "name"),
+        Index("ix_products_price", "price"),
+        Index("ix_products_created_at", "created_at"),
+    )
+
     name: Mapped[str] = mapped_column(unique=True)  # чисто для этого случая
     description: Mapped[str] = mapped_column(TEXT, nullable=True)
     price: Mapped[float] = mapped_column(DECIMAL(10, 2))
 
     image: Mapped[str] = mapped_column(nullable=True)
-    category: Mapped[str] = mapped_column(index=True)
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
+    # read-only, written through ``category_id``; not part of RETURNING rows
+    category: Mapped[str] = column_property(
+        select(Category.name)
+        .where(Category.id == category_id)
+        .correlate_except(Category)
+        .scalar_subquery()
+    )
+
+    # maintained by Postgres, only used for filtering and ranking
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{PRODUCT_SEARCH_CONFIG}', name), 'A') || "
+            f"setweight(to_tsvector('{PRODUCT_SEARCH_CONFIG}', "
+            "coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
+
+event.listen(
+    Product.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -1,10 +1,365 @@
+from collections.abc import Iterable
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    case,
+    event,
+    func,
+    inspect,
+    select,
+    true,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import InstrumentedAttribute, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+from src.cache import TTLCache
 from src.repo import BaseRepository
+from src.repo.exceptions import ErrorMessages, wrap_sqlalchemy_exception
+from src.repo.instrumentation import instrumented, register_cache
+from src.repo.types import LoadOptions
+
+from .constant import (
+    CATEGORY_ERROR_MESSAGES,
+    CATEGORY_ID_CACHE_SIZE,
+    CATEGORY_ID_CACHE_TTL,
+    PRODUCT_CACHE_SIZE,
+    PRODUCT_CACHE_TTL,
+    PRODUCT_ERROR_MESSAGES,
+)
+from .model import Category, Product, category_slug
+
+
+class CategoryRepository(BaseRepository[Category]):
+    model = Category
+    order_by = [Category.id]
+    upsert_conflict_target = [Category.slug]
+    error_messages = CATEGORY_ERROR_MESSAGES
+
+    # id and name of categories by slug, shared by all requests of the process;
+    # only committed categories get here, and a category keeps its id. A
+    # transaction that created categories caches nothing, it can't tell its
+    # own rows from committed ones
+    by_slug: TTLCache[str, tuple[int, str]] = TTLCache(
+        maxsize=CATEGORY_ID_CACHE_SIZE,
+        ttl=CATEGORY_ID_CACHE_TTL,
+    )
+
+    @instrumented
+    async def get_id_by_slug(
+        self,
+        slug: str,
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> Optional[int]:
+        cached = self.by_slug.get(slug)
+        if cached is not None:
+            return cached[0]
+
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            result = await self._execute(
+                select(Category.id, Category.name).where(Category.slug == slug)
+            )
+            row = result.tuples().one_or_none()
+
+        if row is None:
+            return None
+        self._cache({slug: row})
+        return row[0]
+
+    @instrumented
+    async def get_or_create(
+        self,
+        names: Iterable[str],
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> dict[str, tuple[int, str]]:
+        """Id and name of the categories of the names by slug, missing ones are created.
+
+        A new category is named after the first of its names. Categories created
+        here are not cached until a later lookup finds them committed.
+        """
+        names_by_slug: dict[str, str] = {}
+        for name in names:
+            names_by_slug.setdefault(category_slug(name), name)
+
+        categories: dict[str, tuple[int, str]] = {}
+        for slug in names_by_slug:
+            cached = self.by_slug.get(slug)
+            if cached is not None:
+                categories[slug] = cached
 
-from .constant import PRODUCT_ERROR_MESSAGES
-from .model import Product
+        missing = [slug for slug in names_by_slug if slug not in categories]
+        if not missing:
+            return categories
+
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            result = await self._execute(
+                pg_insert(Category)
+                .values(
+                    [{"name": names_by_slug[slug], "slug": slug} for slug in missing]
+                )
+                .on_conflict_do_nothing()
+                .returning(Category.slug, Category.id, Category.name)
+            )
+            created = {slug: (id_, name) for slug, id_, name in result.tuples()}
+            if created:
+                self.session.info["categories_created_in"] = (
+                    self.session.sync_session.get_transaction()
+                )
+
+            existing: dict[str, tuple[int, str]] = {}
+            if len(created) < len(missing):
+                result = await self._execute(
+                    select(Category.slug, Category.id, Category.name).where(
+                        Category.slug.in_(
+                            [slug for slug in missing if slug not in created]
+                        )
+                    )
+                )
+                existing = {slug: (id_, name) for slug, id_, name in result.tuples()}
+
+        self._cache(existing)
+        return categories | existing | created
+
+    def _cache(self, categories: dict[str, tuple[int, str]]) -> None:
+        created_in = self.session.info.get("categories_created_in")
+        if (
+            created_in is not None
+            and created_in is self.session.sync_session.get_transaction()
+        ):
+            return
+        for slug, category in categories.items():
+            self.by_slug.set(slug, category)
 
 
 class ProductRepository(BaseRepository[Product]):
     model = Product
     order_by = [Product.created_at]
+    upsert_conflict_target = [Product.name]
     error_messages = PRODUCT_ERROR_MESSAGES
+
+    # column values by id, shared by all requests of the process; each worker
+    # process has its own, so other workers' writes are only seen after the TTL
+    cache: TTLCache[Any, dict[str, Any]] = TTLCache(
+        maxsize=PRODUCT_CACHE_SIZE,
+        ttl=PRODUCT_CACHE_TTL,
+    )
+
+    @instrumented
+    async def get_one(
+        self,
+        uniquify: Optional[bool] = False,
+        load_options: Optional[LoadOptions] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        **kwargs: Any,
+    ) -> Product:
+        cache_key = self._get_cache_key(load_options, kwargs)
+        if cache_key is not None:
+            instance = await self._get_cached(cache_key)
+            if instance is not None:
+                return instance
+
+        instance = await super().get_one(
+            uniquify=uniquify,
+            load_options=load_options,
+            error_messages=error_messages,
+            **kwargs,
+        )
+        if cache_key is not None:
+            self._set_cached(instance)
+        return instance
+
+    @instrumented
+    async def get_one_or_none(
+        self,
+        uniquify: Optional[bool] = False,
+        load_options: Optional[LoadOptions] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        **kwargs: Any,
+    ) -> Product | None:
+        cache_key = self._get_cache_key(load_options, kwargs)
+        if cache_key is not None:
+            instance = await self._get_cached(cache_key)
+            if instance is not None:
+                return instance
+
+        instance = await super().get_one_or_none(
+            uniquify=uniquify,
+            load_options=load_options,
+            error_messages=error_messages,
+            **kwargs,
+        )
+        if cache_key is not None and instance is not None:
+            self._set_cached(instance)
+        return instance
+
+    @instrumented
+    async def list_by_ids(
+        self,
+        item_ids: Iterable[Any],
+        *,
+        load_options: Optional[LoadOptions] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        id_attribute: Optional[str | InstrumentedAttribute[Any]] = None,
+    ) -> Sequence[Product]:
+        if load_options or id_attribute is not None:
+            return await super().list_by_ids(
+                item_ids,
+                load_options=load_options,
+                error_messages=error_messages,
+                id_attribute=id_attribute,
+            )
+
+        instances: list[Product] = []
+        missing: list[Any] = []
+        for item_id in dict.fromkeys(item_ids):
+            instance = await self._get_cached(item_id)
+            if instance is None:
+                missing.append(item_id)
+            else:
+                instances.append(instance)
+
+        if missing:
+            loaded = await super().list_by_ids(missing, error_messages=error_messages)
+            for instance in loaded:
+                self._set_cached(instance)
+            instances.extend(loaded)
+        return instances
+
+    @instrumented
+    async def facets(
+        self,
+        buckets: int,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> Sequence[Row[Any]]:
+        """Category counts and a price histogram of the matching products.
+
+        One grouped statement over ``GROUPING SETS ((category), (bucket), ())``:
+        rows with ``by_category = 0`` count a category, rows with
+        ``by_bucket = 0`` count one of ``buckets`` equal-width price ranges
+        between the minimum and the maximum price, and the single row grouped
+        by neither carries the total count and the price bounds.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            filtered = self._apply_conditions(
+                select(Category.name.label("category"), Product.price).join(
+                    Category, Category.id == Product.category_id
+                ),
+                conditions,
+            ).cte("filtered")
+            bounds = select(
+                func.min(filtered.c.price).label("low"),
+                func.max(filtered.c.price).label("high"),
+            ).cte("bounds")
+
+            # width_bucket puts the maximum itself into bucket ``buckets + 1``
+            # and rejects equal bounds, both belong in the last/only bucket
+            bucket = case(
+                (bounds.c.low == bounds.c.high, 1),
+                else_=func.least(
+                    func.width_bucket(
+                        filtered.c.price, bounds.c.low, bounds.c.high, buckets
+                    ),
+                    buckets,
+                ),
+            )
+            bucketed = (
+                select(filtered.c.category, filtered.c.price, bucket.label("bucket"))
+                .select_from(filtered.join(bounds, true()))
+                .cte("bucketed")
+            )
+
+            statement = select(
+                bucketed.c.category,
+                bucketed.c.bucket,
+                func.count().label("count"),
+                func.min(bucketed.c.price).label("min_price"),
+                func.max(bucketed.c.price).label("max_price"),
+                func.grouping(bucketed.c.category).label("by_category"),
+                func.grouping(bucketed.c.bucket).label("by_bucket"),
+            ).group_by(
+                func.grouping_sets(
+                    tuple_(bucketed.c.category),
+                    tuple_(bucketed.c.bucket),
+                    tuple_(),
+                )
+            )
+
+            result = await self._execute(statement)
+            return result.all()
+
+    def _after_write(self, instances: Iterable[Product]) -> None:
+        ids = [instance.id for instance in instances]
+        for id_ in ids:
+            self.cache.invalidate(id_)
+
+        # until the transaction commits, another request can still read and
+        # cache the old rows, so they are dropped again once it did
+        if self.session.in_transaction():
+
+            def invalidate(session: Any) -> None:
+                for id_ in ids:
+                    self.cache.invalidate(id_)
+
+            event.listen(
+                self.session.sync_session, "after_commit", invalidate, once=True
+            )
+
+    def _get_cache_key(
+        self,
+        load_options: Optional[LoadOptions],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        """The id for lookups by id alone, ``None`` for anything the cache can't serve.
+
+        The id is converted to the id column's type, like the keys the entries
+        are stored and invalidated under.
+        """
+        if load_options or kwargs.keys() != {self.id_attribute}:
+            return None
+
+        value = kwargs[self.id_attribute]
+        python_type = self._get_mapper().columns[self.id_attribute].type.python_type
+        if isinstance(value, python_type):
+            return value
+        try:
+            return python_type(value)
+        except (AttributeError, TypeError, ValueError):
+            # not an id, the query reports it
+            return None
+
+    async def _get_cached(self, cache_key: Any) -> Product | None:
+        values = self.cache.get(cache_key)
+        if values is None:
+            return None
+
+        # a query would hand out the instance the session already holds
+        existing = self.session.identity_map.get(identity_key(self.model, cache_key))
+        if existing is not None:
+            return existing
+
+        # rebuilt as if loaded by a query, so the session tracks it like any
+        # other loaded instance and no SELECT is emitted
+        instance = self.model(**values)
+        make_transient_to_detached(instance)
+        return await self.session.merge(instance, load=False)
+
+    def _set_cached(self, instance: Product) -> None:
+        state = inspect(instance)
+        self.cache.set(
+            instance.id,
+            {
+                attribute.key: state.dict[attribute.key]
+                for attribute in self._get_mapper().column_attrs
+                if attribute.key in state.dict
+            },
+        )
+
+
+register_cache("Category.by_slug", CategoryRepository.by_slug)
+register_cache("Product.cache", ProductRepository.cache)
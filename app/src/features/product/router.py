@@ -1,39 +1,64 @@
 from typing import List, Literal, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from src.cache.http import conditional_response, make_etag
+from src.config import http_cache_config
 from src.routers import api_prefix_config
 from src.schema.pagination import PaginatedResponse
 
 from .dep import ProductServiceDep
-from .schema import ProductCreate, ProductRead
+from .schema import ProductCreate, ProductFacets, ProductLookup, ProductRead
+from .service import CategoryMatch, SearchMode, TotalMode
 
 router = APIRouter(prefix=api_prefix_config.v1.products, tags=["Products"])
 
 
 @router.get("/", response_model=PaginatedResponse[ProductRead])
 async def list_all_products(
+    request: Request,
+    response: Response,
     service: ProductServiceDep,
     category: Optional[str] = Query(None),
+    category_match: CategoryMatch = "contains",
     price_from: Optional[float] = Query(None, ge=0),
     price_to: Optional[float] = Query(None, ge=0),
     search: Optional[str] = Query(None),
-    sort_by: Optional[Literal["price", "name"]] = None,
+    search_mode: SearchMode = "substring",
+    sort_by: Optional[Literal["price", "name", "created_at"]] = None,
     sort_order: Literal["asc", "desc"] = "asc",
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    total_mode: TotalMode = "exact",
 ):
-    return await service.list_products(
+    page_version = await service.list_products(
         page=page,
         page_size=page_size,
+        cursor=cursor,
         search=search,
+        search_mode=search_mode,
         sort_by=sort_by,
         sort_order=sort_order,
         category=category,
+        category_match=category_match,
         price_from=price_from,
         price_to=price_to,
+        total_mode=total_mode,
     )
 
+    not_modified = conditional_response(
+        request,
+        response,
+        etag=page_version.etag,
+        last_modified=None,
+        cache_control=http_cache_config.product_cache_control,
+    )
+    if not_modified is not None:
+        return not_modified
+    return page_version.build()
+
 
 @router.post("/", response_model=ProductRead)
 async def create_new_product(
@@ -43,22 +68,99 @@ async def create_new_product(
     return await service.add(data)
 
 
+@router.post("/lookup", response_model=List[ProductRead])
+async def lookup_products(
+    data: ProductLookup,
+    service: ProductServiceDep,
+):
+    return await service.lookup_products(data.ids)
+
+
 @router.post("/bulk", response_model=List[ProductRead])
 async def bulk_create_new_product(
     data: List[ProductCreate],
     service: ProductServiceDep,
+    chunk_size: Optional[int] = Query(None, ge=1, le=2000),
+):
+    return await service.add_many(data, chunk_size=chunk_size)
+
+
+@router.put("/bulk", response_model=List[ProductRead])
+async def bulk_upsert_products(
+    data: List[ProductCreate],
+    service: ProductServiceDep,
+):
+    return await service.upsert_many(data)
+
+
+@router.get("/facets", response_model=ProductFacets)
+async def get_product_facets(
+    service: ProductServiceDep,
+    category: Optional[str] = Query(None),
+    category_match: CategoryMatch = "contains",
+    price_from: Optional[float] = Query(None, ge=0),
+    price_to: Optional[float] = Query(None, ge=0),
+    search: Optional[str] = Query(None),
+    search_mode: SearchMode = "substring",
+    buckets: int = Query(10, ge=1, le=100),
 ):
-    products = []
-    for product_data in data:
-        product = await service.add(product_data)
-        products.append(product)
+    return await service.get_facets(
+        buckets=buckets,
+        search=search,
+        search_mode=search_mode,
+        category=category,
+        category_match=category_match,
+        price_from=price_from,
+        price_to=price_to,
+    )
 
-    return products
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_products(
+    service: ProductServiceDep,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    category: Optional[str] = Query(None),
+    category_match: CategoryMatch = "contains",
+    price_from: Optional[float] = Query(None, ge=0),
+    price_to: Optional[float] = Query(None, ge=0),
+    search: Optional[str] = Query(None),
+    search_mode: SearchMode = "substring",
+):
+    media_types = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+    return StreamingResponse(
+        service.export_products(
+            export_format=export_format,
+            search=search,
+            search_mode=search_mode,
+            category=category,
+            category_match=category_match,
+            price_from=price_from,
+            price_to=price_to,
+        ),
+        media_type=media_types[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="products.{export_format}"'
+        },
+    )
 
 
 @router.get("/{product_id}", response_model=ProductRead)
 async def get_product_by_id(
     product_id: UUID,
+    request: Request,
+    response: Response,
     service: ProductServiceDep,
 ):
-    return await service.get_one_by_id(id=product_id)
+    product = await service.get_one_by_id(id=product_id)
+
+    # returned as is, the 304 skips serializing the product
+    not_modified = conditional_response(
+        request,
+        response,
+        etag=make_etag(product.id, product.updated_at.isoformat()),
+        last_modified=product.updated_at,
+        cache_control=http_cache_config.product_cache_control,
+    )
+    if not_modified is not None:
+        return not_modified
+    return product
@@ -1,9 +1,11 @@
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
-from pydantic import PositiveFloat
+from pydantic import Field, PositiveFloat
 from src.schema import BaseSchema
 
+from .constant import PRODUCT_LOOKUP_MAX_IDS
+
 
 class ProductCreate(BaseSchema):
     name: str
@@ -30,3 +32,26 @@ class ProductUpdate(BaseSchema):
 
     image: Optional[str] = None
     category: Optional[str] = None
+
+
+class ProductLookup(BaseSchema):
+    ids: List[UUID] = Field(min_length=1, max_length=PRODUCT_LOOKUP_MAX_IDS)
+
+
+class CategoryFacet(BaseSchema):
+    category: str
+    count: int
+
+
+class PriceBucket(BaseSchema):
+    min_price: float
+    max_price: float
+    count: int
+
+
+class ProductFacets(BaseSchema):
+    total: int
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    categories: List[CategoryFacet]
+    price_histogram: List[PriceBucket]
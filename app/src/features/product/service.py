@@ -1,14 +1,58 @@
+import csv
+import io
 import math
-from typing import List, Literal, Optional
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterator,
+    Hashable,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+)
 from uuid import UUID
 
-from sqlalchemy import ColumnElement, asc, desc, or_
-from src.schema.pagination import PageMeta, PaginatedResponse
-from src.service import BaseService
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    asc,
+    desc,
+    false,
+    func,
+    inspect,
+    or_,
+    select,
+)
+from sqlalchemy.orm.attributes import set_committed_value
+from src.cache import TTLCache
+from src.cache.http import Versioned, make_etag
+from src.repo.exceptions import wrap_sqlalchemy_exception
+from src.repo.instrumentation import register_cache
+from src.repo.types import OrderByExpr
+from src.schema.pagination import PaginatedResponse
+from src.service import BaseService, BatchLoader
 
-from .model import Product
-from .repo import ProductRepository
-from .schema import ProductCreate, ProductRead
+from .constant import (
+    PRODUCT_EXACT_TOTAL_THRESHOLD,
+    PRODUCT_FACETS_CACHE_SIZE,
+    PRODUCT_FACETS_CACHE_TTL,
+    PRODUCT_SEARCH_CONFIG,
+)
+from .model import Category, Product, category_slug
+from .repo import CategoryRepository, ProductRepository
+from .schema import (
+    CategoryFacet,
+    PriceBucket,
+    ProductCreate,
+    ProductFacets,
+    ProductRead,
+)
+
+SearchMode = Literal["substring", "fulltext", "fuzzy"]
+CategoryMatch = Literal["contains", "exact", "fuzzy"]
+TotalMode = Literal["exact", "estimate", "none"]
 
 
 class ProductService(
@@ -25,65 +69,483 @@ class ProductService(
     # async def get_one_by_id(self, product_id: UUID) -> Product:
     #     return await self.repo.get_one(id=product_id)
 
+    # shared by all requests of the process
+    facets_cache: TTLCache[Hashable, ProductFacets] = TTLCache(
+        maxsize=PRODUCT_FACETS_CACHE_SIZE,
+        ttl=PRODUCT_FACETS_CACHE_TTL,
+    )
+
+    # the ``ProductRead`` fields, plus the timestamps the default ordering,
+    # cursors and page ETags read
+    list_columns = (
+        *(getattr(Product, field) for field in ProductRead.model_fields),
+        Product.created_at,
+        Product.updated_at,
+    )
+
+    def __init__(
+        self,
+        repo: ProductRepository,
+        categories: CategoryRepository,
+    ) -> None:
+        super().__init__(repo)
+        self.categories = categories
+        # the service lives as long as the request, and so does the loader
+        self.loader: BatchLoader[UUID, Product] = BatchLoader(self._load_products)
+
+    async def add(self, data: ProductCreate) -> Product:
+        (instance,) = await self._to_instances([data])
+        return await self.repo.add(instance, auto_commit=True)
+
+    async def add_many(
+        self,
+        data: List[ProductCreate],
+        chunk_size: int | None = None,
+    ) -> Sequence[Product]:
+        instances = await self._to_instances(data)
+        products = await self.repo.add_many(
+            instances,
+            chunk_size=chunk_size,
+            auto_commit=True,
+        )
+        return self._with_category_names(products, instances)
+
+    async def upsert_many(self, data: List[ProductCreate]) -> Sequence[Product]:
+        instances = await self._to_instances(data)
+        products = await self.repo.upsert_many(instances, auto_commit=True)
+        return self._with_category_names(products, instances)
+
+    async def _to_instances(self, data: Sequence[ProductCreate]) -> List[Product]:
+        """Products of the data with their category ids, creating missing categories."""
+        categories = await self.categories.get_or_create(item.category for item in data)
+
+        instances = []
+        for item in data:
+            category_id, category_name = categories[category_slug(item.category)]
+            instance = self.model(
+                **item.model_dump(exclude={"category"}), category_id=category_id
+            )
+            set_committed_value(instance, "category", category_name)
+            instances.append(instance)
+        return instances
+
+    @staticmethod
+    def _with_category_names(
+        products: Sequence[Product],
+        instances: Sequence[Product],
+    ) -> Sequence[Product]:
+        # RETURNING rows only carry table columns, the names are known already
+        names = {instance.category_id: instance.category for instance in instances}
+        for product in products:
+            if "category" not in inspect(product).dict:
+                set_committed_value(product, "category", names[product.category_id])
+        return products
+
+    async def get_one_by_id(self, id: UUID, **kwargs: Any) -> Product:
+        """Product by id, concurrent calls of one request are loaded together."""
+        if kwargs:
+            return await super().get_one_by_id(id, **kwargs)
+
+        product = await self.loader.load(id)
+        with wrap_sqlalchemy_exception(error_messages=self.repo.error_messages):
+            return self.repo.check_not_found(product)
+
+    async def lookup_products(self, ids: Iterable[UUID]) -> List[Product]:
+        """Products of the ids in their order, ids without a product are left out."""
+        products = await self.loader.load_many(ids)
+        return [product for product in products if product is not None]
+
+    async def _load_products(self, ids: Sequence[UUID]) -> dict[UUID, Product]:
+        return {product.id: product for product in await self.repo.list_by_ids(ids)}
+
     async def list_products(
         self,
         *,
         page: int,
         page_size: int,
+        cursor: Optional[str] = None,
         search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
         category: Optional[str] = None,
+        category_match: CategoryMatch = "contains",
         price_from: Optional[float] = None,
         price_to: Optional[float] = None,
-        sort_by: Optional[Literal["price", "name"]] = None,
+        sort_by: Optional[Literal["price", "name", "created_at"]] = None,
         sort_order: Literal["asc", "desc"] = "asc",
-    ) -> PaginatedResponse[ProductRead]:
-        conditions = self._build_product_conditions(
+        total_mode: TotalMode = "exact",
+    ) -> Versioned[PaginatedResponse[ProductRead]]:
+        conditions = await self._get_product_conditions(
             search=search,
+            search_mode=search_mode,
             category=category,
+            category_match=category_match,
             price_from=price_from,
             price_to=price_to,
         )
 
-        total = await self.repo.count(conditions)
+        # a rank is no keyset column, so ranked pages hand out no cursors and
+        # a cursor keeps to the default ordering
+        order_by, ranked = self._build_order_by(
+            search=search,
+            search_mode=search_mode,
+            sort_by=sort_by,
+            sort_order=sort_order,
+        )
+        if ranked and cursor is not None:
+            order_by = None
+
+        if cursor is not None:
+            cursor_page = await self.repo.list_by_cursor(
+                limit=page_size,
+                cursor=cursor,
+                conditions=conditions,
+                order_by=order_by,
+                with_total=total_mode == "exact",
+            )
+            total, total_exact = cursor_page.total, True
+            if total_mode != "exact":
+                total, total_exact = await self._get_total(total_mode, conditions)
+
+            return self._versioned_page(
+                cursor_page.items,
+                total=total,
+                total_exact=total_exact,
+                page_size=page_size,
+                next_cursor=cursor_page.next_cursor,
+                prev_cursor=cursor_page.prev_cursor,
+            )
 
         limit = page_size
         offset = (page - 1) * page_size
 
-        order_by = None
+        # read-only rows, offset pages are only serialized
+        if total_mode == "exact":
+            items, total = await self.repo.list_rows_and_count(
+                self.list_columns,
+                limit=limit,
+                offset=offset,
+                conditions=conditions,
+                order_by=order_by,
+            )
+            has_more, total_exact = offset + len(items) < total, True
+        else:
+            # one extra row tells whether a next page exists without counting
+            rows = await self.repo.list_rows(
+                self.list_columns,
+                limit=limit + 1,
+                offset=offset,
+                conditions=conditions,
+                order_by=order_by,
+            )
+            items, has_more = rows[:limit], len(rows) > limit
+
+            # a short page that is not past the end gives the exact total for free
+            known_total = None
+            if not has_more and (items or not offset):
+                known_total = offset + len(items)
+
+            total, total_exact = await self._get_total(
+                total_mode, conditions, known_total=known_total
+            )
+            if total is not None:
+                # the estimate can't be below the rows that were just seen
+                total = max(total, offset + len(items) + int(has_more))
+
+        # offset pages also hand out cursors, so clients can switch to keyset
+        # pagination after the first page
+        next_cursor = prev_cursor = None
+        if items and has_more and not ranked:
+            next_cursor = self.repo.encode_cursor(items[-1], "next", order_by)
+        if items and page > 1 and not ranked:
+            prev_cursor = self.repo.encode_cursor(items[0], "prev", order_by)
+
+        return self._versioned_page(
+            items,
+            total=total,
+            total_exact=total_exact,
+            page=page,
+            page_size=page_size,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+        )
+
+    def _build_order_by(
+        self,
+        *,
+        search: Optional[str],
+        search_mode: SearchMode,
+        sort_by: Optional[Literal["price", "name", "created_at"]],
+        sort_order: Literal["asc", "desc"],
+    ) -> tuple[Optional[List[OrderByExpr]], bool]:
+        """Ordering of a list page, ``None`` for the default, and whether it is by rank."""
         if sort_by:
             column = self.repo._get_instrumented_attr(self.model, sort_by)
-            order_by = [asc(column) if sort_order == "asc" else desc(column)]
+            return [asc(column) if sort_order == "asc" else desc(column)], False
 
-        items = await self.repo.list(
-            limit=limit,
-            offset=offset,
-            conditions=conditions,
-            order_by=order_by,
+        # full-text and fuzzy matches come best first unless another ordering
+        # is asked for
+        rank = self._build_search_rank(search, search_mode) if search else None
+        if rank is None:
+            return None, False
+        return [desc(rank), asc(Product.id)], True
+
+    @staticmethod
+    def _versioned_page(
+        items: Sequence[Product | Row[Any]],
+        **meta: Any,
+    ) -> Versioned[PaginatedResponse[ProductRead]]:
+        """The page with an ETag over its products' versions and its meta.
+
+        No Last-Modified: deleted products and products leaving or joining the
+        page don't move its newest ``updated_at``, only the ETag sees them.
+
+        The rows are only validated into the response when it is built, a
+        ``304`` doesn't need them.
+        """
+        return Versioned(
+            build=partial(PaginatedResponse.from_page, items, **meta),
+            etag=make_etag(
+                *(f"{item.id}@{item.updated_at.isoformat()}" for item in items),
+                *sorted(meta.items()),
+            ),
         )
 
-        total_pages = (total + page_size - 1) // page_size
+    async def _get_total(
+        self,
+        total_mode: TotalMode,
+        conditions: List[ColumnElement[bool]],
+        known_total: Optional[int] = None,
+    ) -> tuple[Optional[int], bool]:
+        """Total for the ``estimate`` and ``none`` modes and whether it is exact.
 
-        return PaginatedResponse(
-            items=items,
-            meta=PageMeta(
-                total=total,
-                page=page,
-                page_size=page_size,
-                total_pages=total_pages,
+        Estimates below ``PRODUCT_EXACT_TOTAL_THRESHOLD`` are replaced with an
+        exact count, which is cheap for so few rows.
+        """
+        if total_mode == "none":
+            return None, False
+        if known_total is not None:
+            return known_total, True
+
+        total = await self.repo.estimate_count(conditions)
+        if total < PRODUCT_EXACT_TOTAL_THRESHOLD:
+            return await self.repo.count(conditions), True
+        return total, False
+
+    async def get_facets(
+        self,
+        *,
+        buckets: int,
+        search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
+        category: Optional[str] = None,
+        category_match: CategoryMatch = "contains",
+        price_from: Optional[float] = None,
+        price_to: Optional[float] = None,
+    ) -> ProductFacets:
+        filters: dict[str, Any] = {
+            "search": search or None,
+            "search_mode": search_mode,
+            "category": category or None,
+            "category_match": category_match,
+            "price_from": price_from or None,
+            "price_to": price_to or None,
+        }
+        cache_key = (buckets, *self._normalize_filters(**filters))
+
+        facets = self.facets_cache.get(cache_key)
+        if facets is not None:
+            return facets
+
+        rows = await self.repo.facets(
+            buckets=buckets,
+            conditions=await self._get_product_conditions(**filters),
+        )
+
+        categories: List[CategoryFacet] = []
+        counts = dict.fromkeys(range(1, buckets + 1), 0)
+        total, low, high = 0, None, None
+        for row in rows:
+            if not row.by_category:
+                categories.append(CategoryFacet(category=row.category, count=row.count))
+            elif not row.by_bucket:
+                counts[row.bucket] = row.count
+            else:
+                total, low, high = row.count, row.min_price, row.max_price
+
+        price_histogram: List[PriceBucket] = []
+        if low is not None and high is not None:
+            width = (high - low) / buckets
+            price_histogram = [
+                PriceBucket(
+                    min_price=float(low + width * (bucket - 1)),
+                    max_price=float(
+                        high if bucket == buckets else low + width * bucket
+                    ),
+                    count=count,
+                )
+                for bucket, count in counts.items()
+            ]
+
+        facets = ProductFacets(
+            total=total,
+            min_price=low,
+            max_price=high,
+            categories=sorted(
+                categories, key=lambda facet: (-facet.count, facet.category)
             ),
+            price_histogram=price_histogram,
+        )
+        self.facets_cache.set(cache_key, facets)
+        return facets
+
+    async def export_products(
+        self,
+        *,
+        export_format: Literal["ndjson", "csv"],
+        search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
+        category: Optional[str] = None,
+        category_match: CategoryMatch = "contains",
+        price_from: Optional[float] = None,
+        price_to: Optional[float] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[str]:
+        conditions = await self._get_product_conditions(
+            search=search,
+            search_mode=search_mode,
+            category=category,
+            category_match=category_match,
+            price_from=price_from,
+            price_to=price_to,
         )
+        fields = list(ProductRead.model_fields)
+
+        if export_format == "csv":
+            # the NDJSON rows' keys, which are the fields' aliases
+            yield self._to_csv(
+                [[ProductRead.model_fields[field].alias or field for field in fields]]
+            )
+
+        # no ordering: the export is a plain sequential scan streamed as it comes
+        async for batch in self.repo.iter_batches(
+            conditions=conditions,
+            order_by=[],
+            batch_size=batch_size,
+        ):
+            products = [ProductRead.model_validate(product) for product in batch]
+
+            if export_format == "csv":
+                yield self._to_csv(
+                    [getattr(product, field) for field in fields]
+                    for product in products
+                )
+            else:
+                yield "".join(
+                    f"{product.model_dump_json(by_alias=True)}\n"
+                    for product in products
+                )
 
     @staticmethod
+    def _to_csv(rows: Iterable[Iterable[object]]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _normalize_filters(
+        *,
+        search: Optional[str],
+        search_mode: SearchMode,
+        category: Optional[str],
+        category_match: CategoryMatch,
+        price_from: Optional[float],
+        price_to: Optional[float],
+    ) -> tuple[Hashable, ...]:
+        """Filters that select the same products map to the same tuple.
+
+        Every search mode and category match ignores case, ``exact`` compares slugs.
+        """
+        if search is not None:
+            search = search.lower()
+        if category is not None:
+            category = (
+                category_slug(category)
+                if category_match == "exact"
+                else category.lower()
+            )
+
+        return (
+            (search_mode, search) if search is not None else None,
+            (category_match, category) if category is not None else None,
+            price_from,
+            price_to,
+        )
+
+    @staticmethod
+    def _search_query(search: str) -> ColumnElement[str]:
+        return func.websearch_to_tsquery(PRODUCT_SEARCH_CONFIG, search)
+
+    @classmethod
+    def _build_search_rank(
+        cls,
+        search: str,
+        search_mode: SearchMode,
+    ) -> Optional[ColumnElement[float]]:
+        if search_mode == "fulltext":
+            return func.ts_rank(Product.search_vector, cls._search_query(search))
+        if search_mode == "fuzzy":
+            return func.word_similarity(search, Product.name)
+        return None
+
+    async def _get_product_conditions(
+        self,
+        *,
+        search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
+        category: Optional[str] = None,
+        category_match: CategoryMatch = "contains",
+        price_from: Optional[float] = None,
+        price_to: Optional[float] = None,
+    ) -> List[ColumnElement[bool]]:
+        """Conditions of the filters, an ``exact`` category is resolved to its id first."""
+        category_id = None
+        if category and category_match == "exact":
+            category_id = await self.categories.get_id_by_slug(category_slug(category))
+
+        return self._build_product_conditions(
+            search=search,
+            search_mode=search_mode,
+            category=category,
+            category_match=category_match,
+            category_id=category_id,
+            price_from=price_from,
+            price_to=price_to,
+        )
+
+    @classmethod
     def _build_product_conditions(
+        cls,
         *,
         search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
         category: Optional[str] = None,
+        category_match: CategoryMatch = "contains",
+        category_id: Optional[int] = None,
         price_from: Optional[float] = None,
         price_to: Optional[float] = None,
     ) -> List[ColumnElement[bool]]:
         conditions: List[ColumnElement[bool]] = []
 
-        if search:
+        if search and search_mode == "fulltext":
+            # served by the GIN index on the generated tsvector column
+            conditions.append(
+                Product.search_vector.bool_op("@@")(cls._search_query(search))
+            )
+        elif search and search_mode == "fuzzy":
+            # ``%>``: the search is similar to some word of the name, typos
+            # included; served by the trigram GIN index
+            conditions.append(Product.name.bool_op("%>")(search))
+        elif search:
             conditions.append(
                 or_(
                     Product.name.ilike(f"%{search}%"),
@@ -91,8 +553,26 @@ class ProductService(
                 )
             )
 
-        if category:
-            conditions.append(Product.category.ilike(f'%{category}%'))
+        if category and category_match == "exact":
+            # integer equality on the leading column of the category indexes;
+            # a slug without a category matches nothing
+            conditions.append(
+                Product.category_id == category_id
+                if category_id is not None
+                else false()
+            )
+        elif category and category_match == "fuzzy":
+            conditions.append(
+                Product.category_id.in_(
+                    select(Category.id).where(Category.name.bool_op("%")(category))
+                )
+            )
+        elif category:
+            conditions.append(
+                Product.category_id.in_(
+                    select(Category.id).where(Category.name.ilike(f"%{category}%"))
+                )
+            )
 
         if price_from:
             conditions.append(Product.price >= price_from)
@@ -101,3 +581,6 @@ class ProductService(
             conditions.append(Product.price <= price_to)
 
         return conditions
+
+
+register_cache("ProductService.facets_cache", ProductService.facets_cache)
@@ -1,19 +1,44 @@
+import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from src.features.cart.store import hot_cart_store
+from src.repo.instrumentation import (
+    RepositoryStats,
+    add_observer,
+    cache_snapshot,
+    remove_observer,
+)
 from src.routers import main_router
 
-from .config import cors_config
+from .config import cart_store_config, cors_config, instrumentation_config
 from .database import db_manager
 from .exception_handlers import register_exception_handlers
 
+logger = logging.getLogger(__name__)
+
+repository_stats = RepositoryStats()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     db_manager.initialize()
+    if cart_store_config.backend == "memory":
+        hot_cart_store.initialize(db_manager.session_factory)
+    if instrumentation_config.repository_stats:
+        add_observer(repository_stats)
     yield
+    if instrumentation_config.repository_stats:
+        remove_observer(repository_stats)
+        for entry in repository_stats.snapshot():
+            logger.info("repository stats: %s", entry)
+        for entry in cache_snapshot():
+            logger.info("cache stats: %s", entry)
+    if cart_store_config.backend == "memory":
+        # the carts' last changes are written before the engine goes away
+        await hot_cart_store.dispose()
     await db_manager.dispose()
 
 
@@ -1,36 +1,91 @@
-# TODO: add
-# upsert()
-# upsert_many()
-# delete()
-# delete_many()
-# delete_where()
-
 # TODO: add conditions to every method it can be added
 
 
-from collections.abc import Iterable
-from typing import Any, List, Literal, Optional, Sequence, Type, Union, cast
-
-from sqlalchemy import ColumnElement, Result, Select, UnaryExpression, func, select
+from collections.abc import AsyncIterator, Callable, Hashable, Iterable
+from itertools import batched
+from typing import Any, ClassVar, List, Literal, Optional, Sequence, Type, Union, cast
+
+from sqlalchemy import (
+    Column,
+    ColumnElement,
+    Delete,
+    Executable,
+    Result,
+    Row,
+    Select,
+    UnaryExpression,
+    Update,
+    any_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    update,
+)
+from sqlalchemy import cast as cast_
+from sqlalchemy import column as sql_column
 from sqlalchemy import exists as sql_exists
+from sqlalchemy import values as sql_values
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql import operators
 from sqlalchemy.sql.selectable import ForUpdateParameter
 
 from .constants import DEFAULT_ERROR_MESSAGE_TEMPLATES
-from .exceptions import ErrorMessages, NotFoundError, wrap_sqlalchemy_exception
-from .types import LoadOptions, OrderByExpr, StatementTypeT
+from .cursor import (
+    CursorDirection,
+    CursorPage,
+    KeysetColumn,
+    decode_cursor,
+    encode_cursor,
+    keyset_condition,
+)
+from .exceptions import (
+    BulkOperationError,
+    ErrorMessages,
+    InvalidCursorError,
+    NotFoundError,
+    RepositoryError,
+    wrap_sqlalchemy_exception,
+)
+from .explain import Explain, load_plan
+from .instrumentation import instrumented, record_statement
+from .types import LoadOptions, OrderByExpr, SelectColumn, StatementTypeT
 
 
 class BaseRepository[ModelT]:
     model: Type[ModelT]
 
+    id_attribute: str = "id"
+    """Name of the primary key attribute, also used as the keyset tiebreaker."""
+
     order_by: Iterable[OrderByExpr] | None = None
     """Default ordering expressions for select queries."""
 
     error_messages: Optional[ErrorMessages] = None
     """Default error messages for the repository."""
 
+    upsert_conflict_target: Iterable[str | InstrumentedAttribute[Any]] | None = None
+    """Default ``ON CONFLICT`` target for upserts, the primary key when not set."""
+
+    bulk_chunk_size: int = 500
+    """Rows per multi-row ``VALUES`` statement in bulk operations."""
+
+    statement_cache_size: int = 256
+    """Select statement shapes kept per repository class, ``0`` disables caching."""
+
+    _statement_cache: ClassVar[dict[Hashable, Select[Any]]] = {}
+    _class_error_messages: ClassVar[Optional[ErrorMessages]] = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._statement_cache = {}
+        cls._class_error_messages = None
+
     def __init__(
         self,
         session: AsyncSession,
@@ -45,9 +100,14 @@ class BaseRepository[ModelT]:
 
         self.order_by = order_by if order_by is not None else self.order_by
 
-        self.error_messages = self._get_error_messages(
-            error_messages=error_messages,
-            default_messages=self.error_messages,
+        # the merged map is shared by every instance without its own overrides
+        self.error_messages = (
+            self._get_error_messages(
+                error_messages=error_messages,
+                default_messages=self._get_class_error_messages(),
+            )
+            if error_messages
+            else self._get_class_error_messages()
         )
 
     async def _flush_or_commit(self, auto_commit: Optional[bool]) -> Any | None:
@@ -60,10 +120,12 @@ class BaseRepository[ModelT]:
 
     async def _execute(
         self,
-        statement: Select[Any],
+        statement: Executable,
         uniquify: bool = False,
+        params: Optional[dict[str, Any]] = None,
     ) -> Result[Any]:
-        result = await self.session.execute(statement)
+        record_statement(statement)
+        result = await self.session.execute(statement, params)
 
         if uniquify:
             result = result.unique()
@@ -104,6 +166,7 @@ class BaseRepository[ModelT]:
             else None
         )
 
+    @instrumented
     async def add(
         self,
         data: ModelT,
@@ -113,13 +176,11 @@ class BaseRepository[ModelT]:
         attribute_names: Optional[Iterable[str]] = None,
         error_messages: Optional[ErrorMessages | None] = None,
     ) -> ModelT:
-        error_messages = self._get_error_messages(
-            error_messages=error_messages,
-            default_messages=self.error_messages,
-        )
+        error_messages = self._resolve_error_messages(error_messages)
         with wrap_sqlalchemy_exception(error_messages=error_messages):
             instance = await self._attach_to_session(data)
             await self._flush_or_commit(auto_commit=auto_commit)
+            self._after_write([instance])
             await self._refresh(
                 instance,
                 attribute_names=attribute_names,
@@ -127,22 +188,137 @@ class BaseRepository[ModelT]:
             )
             return instance
 
+    @instrumented
     async def add_many(
         self,
-        data: List[ModelT],
+        data: Iterable[ModelT],
         *,
+        chunk_size: Optional[int] = None,
         auto_commit: Optional[bool] = None,
         error_messages: Optional[ErrorMessages | None] = None,
     ) -> Sequence[ModelT]:
-        error_messages = self._get_error_messages(
+        """Chunked multi-row ``INSERT ... RETURNING`` of the instances' column values.
+
+        All chunks run inside one savepoint. When rows fail, the failing chunks
+        are replayed row by row to collect every error, nothing is written and
+        ``BulkOperationError`` reports the failures by row index.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
+        rows = [self._get_insert_values(item) for item in data]
+
+        instances: List[ModelT] = []
+        errors: List[tuple[int, RepositoryError]] = []
+
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            savepoint = await self.session.begin_nested()
+
+        offset = 0
+        for chunk in batched(rows, chunk_size or self.bulk_chunk_size):
+            try:
+                instances.extend(await self._insert_rows(chunk, error_messages))
+            except RepositoryError:
+                for index, row in enumerate(chunk, start=offset):
+                    try:
+                        instances.extend(await self._insert_rows([row], error_messages))
+                    except RepositoryError as exc:
+                        errors.append((index, exc))
+            offset += len(chunk)
+
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            if errors:
+                await savepoint.rollback()
+                raise BulkOperationError(str(errors[0][1]), errors=errors)
+
+            await savepoint.commit()
+            await self._flush_or_commit(auto_commit=auto_commit)
+            self._after_write(instances)
+            return instances
+
+    @instrumented
+    async def upsert(
+        self,
+        data: ModelT,
+        *,
+        conflict_target: Iterable[str | InstrumentedAttribute[Any]] | None = None,
+        update_columns: Iterable[str | InstrumentedAttribute[Any]] | None = None,
+        auto_commit: Optional[bool] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> ModelT:
+        error_messages = self._resolve_error_messages(error_messages)
+        instances = await self.upsert_many(
+            [data],
+            conflict_target=conflict_target,
+            update_columns=update_columns,
+            auto_commit=auto_commit,
             error_messages=error_messages,
-            default_messages=self.error_messages,
         )
         with wrap_sqlalchemy_exception(error_messages=error_messages):
-            self.session.add_all(data)
+            # nothing comes back when the conflict is resolved with DO NOTHING
+            return self.check_not_found(instances[0] if instances else None)
+
+    @instrumented
+    async def upsert_many(
+        self,
+        data: Iterable[ModelT],
+        *,
+        conflict_target: Iterable[str | InstrumentedAttribute[Any]] | None = None,
+        update_columns: Iterable[str | InstrumentedAttribute[Any]] | None = None,
+        chunk_size: Optional[int] = None,
+        auto_commit: Optional[bool] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> Sequence[ModelT]:
+        """``INSERT ... ON CONFLICT DO UPDATE ... RETURNING`` in multi-row chunks.
+
+        ``update_columns`` defaults to every column except the primary key, the
+        conflict target and insert-only columns such as ``created_at``. Rows
+        repeating a conflict key within one chunk are collapsed, the last one wins.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            target = self._get_columns(
+                conflict_target
+                if conflict_target is not None
+                else self.upsert_conflict_target
+            ) or list(self._get_mapper().primary_key)
+            updates = (
+                self._get_columns(update_columns)
+                if update_columns is not None
+                else self._get_upsert_update_columns(target)
+            )
+
+            instances: List[ModelT] = []
+            rows = [self._get_insert_values(item) for item in data]
+
+            for chunk in batched(rows, chunk_size or self.bulk_chunk_size):
+                unique_rows = {
+                    tuple(row.get(column.key) for column in target): row
+                    for row in chunk
+                }
+
+                statement = pg_insert(self.model).values(list(unique_rows.values()))
+                if updates:
+                    statement = statement.on_conflict_do_update(
+                        index_elements=target,
+                        set_={
+                            column.name: statement.excluded[column.key]
+                            for column in updates
+                        },
+                    )
+                else:
+                    statement = statement.on_conflict_do_nothing(index_elements=target)
+
+                result = await self._execute(
+                    statement.returning(self.model).execution_options(
+                        populate_existing=True
+                    )
+                )
+                instances.extend(result.scalars().all())
+
             await self._flush_or_commit(auto_commit=auto_commit)
-            return data
+            self._after_write(instances)
+            return instances
 
+    @instrumented
     async def list(
         self,
         limit: int,
@@ -154,53 +330,355 @@ class BaseRepository[ModelT]:
         error_messages: Optional[ErrorMessages | None] = None,
         **kwargs: Any,
     ) -> Sequence[ModelT]:
-        # TODO: apply pagination filters
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            statement, params = self._get_select_statement(
+                conditions=conditions,
+                load_options=load_options,
+                order_by=order_by,
+                **kwargs,
+            )
+
+            # NOTE: only for this project
+            statement = statement.limit(limit).offset(offset)
 
-        error_messages = self._get_error_messages(
+            result = await self._execute(statement, uniquify=uniquify, params=params)
+            instances = result.scalars().all()
+            return instances
+
+    @instrumented
+    async def list_and_count(
+        self,
+        limit: int,
+        offset: int,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        uniquify: Optional[bool] = False,
+        load_options: Optional[LoadOptions] = None,
+        order_by: Iterable[OrderByExpr] | None = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        **kwargs: Any,
+    ) -> tuple[Sequence[ModelT], int]:
+        """Page and total count of all matching rows in a single statement.
+
+        The total is taken from a ``count(*) OVER ()`` window, so it counts
+        joined rows when ``load_options`` contain a ``joinedload``.
+        """
+        rows, total = await self._list_with_total(
+            limit=limit,
+            offset=offset,
+            conditions=conditions,
+            uniquify=uniquify,
+            load_options=load_options,
+            order_by=order_by,
             error_messages=error_messages,
-            default_messages=self.error_messages,
+            **kwargs,
         )
+        return [row[0] for row in rows], total
+
+    @instrumented
+    async def list_rows(
+        self,
+        columns: Sequence[SelectColumn],
+        limit: int,
+        offset: int,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        order_by: Iterable[OrderByExpr] | None = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        **kwargs: Any,
+    ) -> Sequence[Row[Any]]:
+        """Read-only ``list`` of just ``columns``, as rows instead of instances.
+
+        Rows don't go through the identity map and nothing tracks them, which
+        saves most of the cost of loading a page that is only serialized.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
         with wrap_sqlalchemy_exception(error_messages=error_messages):
-            statement = select(self.model)
+            statement, params = self._get_select_statement(
+                conditions=conditions,
+                order_by=order_by,
+                columns=columns,
+                **kwargs,
+            )
 
-            if order_by is None:
-                order_by = self.order_by if self.order_by is not None else []
+            # NOTE: only for this project
+            statement = statement.limit(limit).offset(offset)
 
-            statement = self._apply_order_by(statement=statement, order_by=order_by)
-            statement = self._apply_select_filters_by_kwargs(statement, **kwargs)
-            statement = self._apply_load_options(statement, load_options)
-            statement = self._apply_conditions(statement, conditions)
+            result = await self._execute(statement, params=params)
+            return result.all()
+
+    @instrumented
+    async def list_rows_and_count(
+        self,
+        columns: Sequence[SelectColumn],
+        limit: int,
+        offset: int,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        order_by: Iterable[OrderByExpr] | None = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        **kwargs: Any,
+    ) -> tuple[Sequence[Row[Any]], int]:
+        """Read-only ``list_and_count``, the rows also carry the ``total`` column."""
+        return await self._list_with_total(
+            limit=limit,
+            offset=offset,
+            conditions=conditions,
+            order_by=order_by,
+            columns=columns,
+            error_messages=error_messages,
+            **kwargs,
+        )
+
+    async def _list_with_total(
+        self,
+        limit: int,
+        offset: int,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        uniquify: Optional[bool] = False,
+        load_options: Optional[LoadOptions] = None,
+        order_by: Iterable[OrderByExpr] | None = None,
+        columns: Optional[Sequence[SelectColumn]] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        **kwargs: Any,
+    ) -> tuple[Sequence[Row[Any]], int]:
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            statement, params = self._get_select_statement(
+                conditions=conditions,
+                load_options=load_options,
+                order_by=order_by,
+                columns=columns,
+                **kwargs,
+            )
+            statement = statement.add_columns(func.count().over().label("total"))
 
             # NOTE: only for this project
             statement = statement.limit(limit).offset(offset)
 
-            result = await self._execute(statement, uniquify=uniquify)
-            instances = result.scalars().all()
-            return instances
+            result = await self._execute(statement, uniquify=uniquify, params=params)
+            rows = result.all()
 
-    async def get_one(
+        if rows:
+            return rows, rows[0].total
+
+        # the window has nothing to count over once the offset runs past the end
+        total = (
+            await self.count(conditions, error_messages=error_messages, **kwargs)
+            if offset
+            else 0
+        )
+        return [], total
+
+    @instrumented
+    async def list_by_cursor(
         self,
+        limit: int,
+        cursor: Optional[str] = None,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
         uniquify: Optional[bool] = False,
         load_options: Optional[LoadOptions] = None,
+        order_by: Iterable[OrderByExpr] | None = None,
         error_messages: Optional[ErrorMessages | None] = None,
+        with_total: bool = False,
         **kwargs: Any,
-    ) -> ModelT:
-        error_messages = self._get_error_messages(
+    ) -> CursorPage[ModelT]:
+        """Keyset pagination over ``order_by`` plus the id attribute as a tiebreaker.
+
+        Unlike ``list``, the cost of a page does not depend on how deep it is.
+        With ``with_total`` the count of all matching rows is fetched by the same
+        statement as a scalar subquery.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            columns = self._get_keyset_columns(order_by)
+
+            direction: CursorDirection = "next"
+            filters = list(conditions or [])
+            if cursor is not None:
+                direction, values = decode_cursor(cursor, columns)
+                filters.append(keyset_condition(columns, values, direction))
+
+            # walking backwards reverses the ordering, the page is flipped back below
+            backwards = direction == "prev"
+            statement, params = self._get_select_statement(
+                conditions=filters,
+                load_options=load_options,
+                order_by=[
+                    (
+                        column.attribute.desc()
+                        if column.descending != backwards
+                        else column.attribute.asc()
+                    )
+                    for column in columns
+                ],
+                **kwargs,
+            )
+            if with_total:
+                # both statements bind the same ``filter_by`` parameters
+                count_statement, _ = self._get_count_statement(conditions, **kwargs)
+                statement = statement.add_columns(count_statement.scalar_subquery())
+            statement = statement.limit(limit + 1)
+
+            result = await self._execute(statement, uniquify=uniquify, params=params)
+            rows = result.all()
+            instances = [row[0] for row in rows]
+
+            total = None
+            if with_total:
+                total = (
+                    rows[0][1]
+                    if rows
+                    else await self.count(
+                        conditions, error_messages=error_messages, **kwargs
+                    )
+                )
+
+            has_more = len(instances) > limit
+            instances = instances[:limit]
+            if backwards:
+                instances.reverse()
+
+            has_next = has_more if not backwards else True
+            has_prev = has_more if backwards else cursor is not None
+
+            return CursorPage(
+                items=instances,
+                next_cursor=(
+                    self._encode_keyset_cursor(columns, instances[-1], "next")
+                    if instances and has_next
+                    else None
+                ),
+                prev_cursor=(
+                    self._encode_keyset_cursor(columns, instances[0], "prev")
+                    if instances and has_prev
+                    else None
+                ),
+                total=total,
+            )
+
+    @instrumented
+    async def iter_batches(
+        self,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        order_by: Iterable[OrderByExpr] | None = None,
+        batch_size: int = 1000,
+        load_options: Optional[LoadOptions] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[Sequence[ModelT]]:
+        """Walk every matching row in batches over a server-side cursor.
+
+        A batch is expunged from the session once the caller asks for the next
+        one, so memory stays bounded by ``batch_size`` however large the table.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            statement, params = self._get_select_statement(
+                conditions=conditions,
+                load_options=load_options,
+                order_by=order_by,
+                **kwargs,
+            )
+            statement = statement.execution_options(yield_per=batch_size)
+
+            record_statement(statement)
+            result = await self.session.stream_scalars(statement, params)
+            try:
+                async for batch in result.partitions():
+                    yield batch
+                    for instance in batch:
+                        self.session.expunge(instance)
+            finally:
+                await result.close()
+
+    @instrumented
+    async def stream(
+        self,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        order_by: Iterable[OrderByExpr] | None = None,
+        batch_size: int = 1000,
+        load_options: Optional[LoadOptions] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ModelT]:
+        async for batch in self.iter_batches(
+            conditions=conditions,
+            order_by=order_by,
+            batch_size=batch_size,
+            load_options=load_options,
             error_messages=error_messages,
-            default_messages=self.error_messages,
-        )
+            **kwargs,
+        ):
+            for instance in batch:
+                yield instance
+
+    def encode_cursor(
+        self,
+        item: Any,
+        direction: CursorDirection = "next",
+        order_by: Iterable[OrderByExpr] | None = None,
+    ) -> str:
+        """Cursor pointing after (``next``) or before (``prev``) ``item`` for ``list_by_cursor``."""
+        columns = self._get_keyset_columns(order_by)
+        return self._encode_keyset_cursor(columns, item, direction)
+
+    @instrumented
+    async def list_by_ids(
+        self,
+        item_ids: Iterable[Any],
+        *,
+        load_options: Optional[LoadOptions] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        id_attribute: Optional[str | InstrumentedAttribute[Any]] = None,
+    ) -> Sequence[ModelT]:
+        """Rows of the given ids in one ``WHERE id = ANY(:ids)``, in no particular order.
+
+        Ids without a row are skipped. The ids are bound as one array, so the
+        statement is the same however many there are.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
         with wrap_sqlalchemy_exception(error_messages=error_messages):
-            statement = select(self.model)
+            id_attr = self._get_instrumented_attr(
+                self.model,
+                id_attribute if id_attribute is not None else self.id_attribute,
+            )
+            ids = list(dict.fromkeys(item_ids))
+            if not ids:
+                return []
+
+            statement, params = self._get_select_statement(
+                conditions=[
+                    id_attr == any_(bindparam("ids", ids, type_=ARRAY(id_attr.type)))
+                ],
+                load_options=load_options,
+                order_by=[],
+            )
 
-            statement = self._apply_select_filters_by_kwargs(statement, **kwargs)
-            statement = self._apply_load_options(statement, load_options)
+            result = await self._execute(statement, params=params)
+            return result.scalars().all()
+
+    @instrumented
+    async def get_one(
+        self,
+        uniquify: Optional[bool] = False,
+        load_options: Optional[LoadOptions] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        **kwargs: Any,
+    ) -> ModelT:
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            statement, params = self._get_select_statement(
+                load_options=load_options,
+                order_by=[],
+                **kwargs,
+            )
 
             instance = (
-                await self._execute(statement, uniquify=uniquify)
+                await self._execute(statement, uniquify=uniquify, params=params)
             ).scalar_one_or_none()
             instance = self.check_not_found(instance)
             return instance
 
+    @instrumented
     async def get_one_or_none(
         self,
         uniquify: Optional[bool] = False,
@@ -208,23 +686,22 @@ class BaseRepository[ModelT]:
         error_messages: Optional[ErrorMessages | None] = None,
         **kwargs: Any,
     ) -> ModelT | None:
-        error_messages = self._get_error_messages(
-            error_messages=error_messages,
-            default_messages=self.error_messages,
-        )
+        error_messages = self._resolve_error_messages(error_messages)
         with wrap_sqlalchemy_exception(error_messages=error_messages):
-            statement = select(self.model)
-
-            statement = self._apply_select_filters_by_kwargs(statement, **kwargs)
-            statement = self._apply_load_options(statement, load_options)
+            statement, params = self._get_select_statement(
+                load_options=load_options,
+                order_by=[],
+                **kwargs,
+            )
 
             instance = cast(
                 "Result[tuple[ModelT]]",
-                (await self._execute(statement, uniquify=uniquify)),
+                (await self._execute(statement, uniquify=uniquify, params=params)),
             ).scalar_one_or_none()
 
             return instance
 
+    @instrumented
     async def update(
         self,
         instance: ModelT,
@@ -235,10 +712,7 @@ class BaseRepository[ModelT]:
         with_for_update: ForUpdateParameter = None,
         error_messages: Optional[ErrorMessages | None] = None,
     ) -> ModelT:
-        error_messages = self._get_error_messages(
-            error_messages=error_messages,
-            default_messages=self.error_messages,
-        )
+        error_messages = self._resolve_error_messages(error_messages)
         with wrap_sqlalchemy_exception(error_messages=error_messages):
             instance = await self._attach_to_session(
                 instance,
@@ -246,6 +720,7 @@ class BaseRepository[ModelT]:
             )
 
             await self._flush_or_commit(auto_commit=auto_commit)
+            self._after_write([instance])
             await self._refresh(
                 instance,
                 attribute_names=attribute_names,
@@ -254,71 +729,200 @@ class BaseRepository[ModelT]:
             )
             return instance
 
+    @instrumented
     async def update_many(
         self,
         instances: Iterable[ModelT],
         *,
+        chunk_size: Optional[int] = None,
         auto_commit: Optional[bool] = None,
         auto_refresh: Optional[bool] = None,
         attribute_names: Optional[Iterable[str]] = None,
         with_for_update: ForUpdateParameter = None,
         error_messages: Optional[ErrorMessages | None] = None,
     ) -> Sequence[ModelT]:
-        error_messages = self._get_error_messages(
-            error_messages=error_messages,
-            default_messages=self.error_messages,
-        )
+        """Bulk update by primary key with ``UPDATE ... FROM (VALUES ...) RETURNING``.
 
-        with wrap_sqlalchemy_exception(error_messages=error_messages):
-            merged_instances: list[ModelT] = []
+        A loaded instance contributes the columns it changed, a new one every
+        column value it holds; instances writing the same set of columns share
+        one statement per chunk and instances without changes are left out.
+        Updated rows come back through ``RETURNING``, which stands in for the
+        refresh; ``attribute_names`` or ``with_for_update`` refresh each of them
+        again like ``update`` does.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
 
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            primary_key = {column.key for column in self._get_mapper().primary_key}
+            groups: dict[tuple[str, ...], List[dict[str, Any]]] = {}
             for instance in instances:
-                merged = await self._attach_to_session(
-                    instance,
-                    strategy="merge",
-                )
-                merged_instances.append(merged)
+                values = self._get_update_values(instance)
+                if values.keys() <= primary_key:
+                    continue
+                groups.setdefault(tuple(values), []).append(values)
+
+            updated_instances: List[ModelT] = []
+            for keys, rows in groups.items():
+                for chunk in batched(rows, chunk_size or self.bulk_chunk_size):
+                    statement = self._get_bulk_update_statement(keys, chunk)
+                    updated_instances.extend(await self._update_returning(statement))
 
             await self._flush_or_commit(auto_commit=auto_commit)
+            self._after_write(updated_instances)
+
+            if attribute_names is not None or with_for_update is not None:
+                for instance in updated_instances:
+                    await self._refresh(
+                        instance,
+                        attribute_names=attribute_names,
+                        with_for_update=with_for_update,
+                        auto_refresh=auto_refresh,
+                    )
+            return updated_instances
+
+    @instrumented
+    async def update_where(
+        self,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        values: Optional[dict[str, Any]] = None,
+        *,
+        auto_commit: Optional[bool] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        **kwargs: Any,
+    ) -> Sequence[ModelT]:
+        if not values:
+            msg = "update_where requires at least one column value to set"
+            raise ValueError(msg)
 
-            for instance in merged_instances:
-                await self._refresh(
-                    instance,
-                    attribute_names=attribute_names,
-                    with_for_update=with_for_update,
-                    auto_refresh=auto_refresh,
-                )
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            statement = update(self.model).values(values)
+            statement = self._apply_select_filters_by_kwargs(statement, **kwargs)
+            statement = self._apply_conditions(statement, conditions)
 
-            return merged_instances
+            instances = await self._update_returning(statement)
+
+            await self._flush_or_commit(auto_commit=auto_commit)
+            self._after_write(instances)
+            return instances
+
+    @instrumented
+    async def delete(
+        self,
+        item_id: Any,
+        *,
+        auto_commit: Optional[bool] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        id_attribute: Optional[str | InstrumentedAttribute[Any]] = None,
+    ) -> ModelT:
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            id_attr = self._get_instrumented_attr(
+                self.model,
+                id_attribute if id_attribute is not None else self.id_attribute,
+            )
+            statement = delete(self.model).where(id_attr == item_id)
 
+            instances = await self._delete_returning(statement)
+            instance = self.check_not_found(instances[0] if instances else None)
+
+            await self._flush_or_commit(auto_commit=auto_commit)
+            self._after_write([instance])
+            return instance
+
+    @instrumented
+    async def delete_many(
+        self,
+        item_ids: Iterable[Any],
+        *,
+        chunk_size: Optional[int] = None,
+        auto_commit: Optional[bool] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        id_attribute: Optional[str | InstrumentedAttribute[Any]] = None,
+    ) -> Sequence[ModelT]:
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            id_attr = self._get_instrumented_attr(
+                self.model,
+                id_attribute if id_attribute is not None else self.id_attribute,
+            )
+
+            instances: List[ModelT] = []
+            for chunk in batched(item_ids, chunk_size or self.bulk_chunk_size):
+                statement = delete(self.model).where(id_attr.in_(chunk))
+                instances.extend(await self._delete_returning(statement))
+
+            await self._flush_or_commit(auto_commit=auto_commit)
+            self._after_write(instances)
+            return instances
+
+    @instrumented
+    async def delete_where(
+        self,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        *,
+        auto_commit: Optional[bool] = None,
+        error_messages: Optional[ErrorMessages | None] = None,
+        **kwargs: Any,
+    ) -> Sequence[ModelT]:
+        error_messages = self._resolve_error_messages(error_messages)
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            statement = delete(self.model)
+            statement = self._apply_select_filters_by_kwargs(statement, **kwargs)
+            statement = self._apply_conditions(statement, conditions)
+
+            instances = await self._delete_returning(statement)
+
+            await self._flush_or_commit(auto_commit=auto_commit)
+            self._after_write(instances)
+            return instances
+
+    @instrumented
     async def count(
         self,
         conditions: Optional[Iterable[ColumnElement[bool]]] = None,
         error_messages: Optional[ErrorMessages] = None,
         **kwargs: Any,
     ) -> int:
-        error_messages = self._get_error_messages(
-            error_messages=error_messages,
-            default_messages=self.error_messages,
-        )
+        error_messages = self._resolve_error_messages(error_messages)
 
         with wrap_sqlalchemy_exception(error_messages=error_messages):
-            statement = select(func.count()).select_from(self.model)
-            statement = self._apply_conditions(statement, conditions)
-            statement = self._apply_select_filters_by_kwargs(statement, **kwargs)
+            statement, params = self._get_count_statement(conditions, **kwargs)
 
-            result = await self._execute(statement)
+            result = await self._execute(statement, params=params)
             return result.scalar_one()
 
+    @instrumented
+    async def estimate_count(
+        self,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        error_messages: Optional[ErrorMessages] = None,
+        **kwargs: Any,
+    ) -> int:
+        """Planner's row estimate for the matching rows, taken from ``EXPLAIN``.
+
+        Nothing is counted, so the cost does not grow with the table, but the
+        number is only as good as the table statistics. Postgres only.
+        """
+        error_messages = self._resolve_error_messages(error_messages)
+
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            statement, params = self._get_select_statement(
+                conditions=conditions,
+                order_by=[],
+                **kwargs,
+            )
+
+            result = await self._execute(Explain(statement), params=params)
+            return int(load_plan(result.scalar_one())["Plan Rows"])
+
+    @instrumented
     async def exists(
         self,
         conditions: Optional[Iterable[ColumnElement[bool]]] = None,
         error_messages: Optional[ErrorMessages | None] = None,
     ) -> bool:
-        error_messages = self._get_error_messages(
-            error_messages=error_messages,
-            default_messages=self.error_messages,
-        )
+        error_messages = self._resolve_error_messages(error_messages)
 
         with wrap_sqlalchemy_exception(error_messages=error_messages):
             subquery = select(1).select_from(self.model)
@@ -326,15 +930,320 @@ class BaseRepository[ModelT]:
 
             statement = select(sql_exists(subquery))
 
-            result = await self.session.execute(statement)
+            result = await self._execute(statement)
             return bool(result.scalar())
 
-    # @staticmethod
-    # def _apply_pagination_filters(
-    #     statement: StatementTypeT,
-    #     **filters: Any,
-    # ) -> StatementTypeT:
-    #     pass
+    def _after_write(self, instances: Iterable[ModelT]) -> None:
+        """Hook called with the rows every write method inserted, changed or deleted.
+
+        Runs once the write is flushed or committed; subclasses keeping a cache
+        invalidate it here.
+        """
+
+    async def _insert_rows(
+        self,
+        rows: Sequence[dict[str, Any]],
+        error_messages: ErrorMessages,
+    ) -> Sequence[ModelT]:
+        with wrap_sqlalchemy_exception(error_messages=error_messages):
+            async with self.session.begin_nested():
+                result = await self._execute(
+                    insert(self.model).values(list(rows)).returning(self.model)
+                )
+                return result.scalars().all()
+
+    async def _update_returning(self, statement: Update) -> List[ModelT]:
+        result = await self._execute(
+            statement.returning(self.model).execution_options(
+                synchronize_session=False,
+                populate_existing=True,
+            )
+        )
+        return list(result.scalars().all())
+
+    def _get_bulk_update_statement(
+        self,
+        keys: Sequence[str],
+        rows: Sequence[dict[str, Any]],
+    ) -> Update:
+        columns = self._get_mapper().columns
+        primary_key = {column.key for column in self._get_mapper().primary_key}
+
+        data = (
+            sql_values(
+                *(sql_column(columns[key].name, columns[key].type) for key in keys),
+                name="data",
+            )
+            .data([tuple(row[key] for key in keys) for row in rows])
+            .alias("data")
+        )
+        # casts keep the column types when a VALUES column only holds NULLs
+        source = {
+            key: cast_(data.c[columns[key].name], columns[key].type) for key in keys
+        }
+        return (
+            update(self.model)
+            .where(*(columns[key] == source[key] for key in keys if key in primary_key))
+            .values({key: source[key] for key in keys if key not in primary_key})
+        )
+
+    def _get_update_values(self, item: ModelT) -> dict[str, Any]:
+        """Primary key and column values to write for an instance, ordered by column.
+
+        A loaded (persistent or detached) instance writes the columns changed
+        since it was loaded, a new one every column value it holds. Columns with
+        ``onupdate`` are left out so their update default applies.
+        """
+        state = inspect(item)
+        primary_key = {column.key for column in self._get_mapper().primary_key}
+        values: dict[str, Any] = {}
+
+        for key, column in self._get_table_columns().items():
+            if key not in state.dict or column.onupdate is not None:
+                continue
+            if (
+                state.has_identity
+                and key not in primary_key
+                and not state.attrs[key].history.has_changes()
+            ):
+                continue
+            values[key] = state.dict[key]
+
+        if any(column.key not in values for column in self._get_mapper().primary_key):
+            msg = "Bulk update requires the primary key of every instance"
+            raise ValueError(msg)
+        return values
+
+    async def _delete_returning(self, statement: Delete) -> List[ModelT]:
+        """Run a set-based ``DELETE ... RETURNING`` without loading rows first.
+
+        The returned instances describe rows that no longer exist, so they are
+        detached instead of lingering in the identity map as persistent objects.
+        """
+        result = await self._execute(statement.returning(self.model))
+        instances = list(result.scalars().all())
+
+        for instance in instances:
+            self.session.expunge(instance)
+        return instances
+
+    def _get_select_statement(
+        self,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        load_options: Optional[LoadOptions] = None,
+        order_by: Iterable[OrderByExpr] | None = None,
+        columns: Optional[Sequence[SelectColumn]] = None,
+        **kwargs: Any,
+    ) -> tuple[Select[tuple[ModelT]], dict[str, Any]]:
+        """Select statement and the parameters to execute it with.
+
+        The ordering and ``filter_by`` part is built once per shape and then
+        reused with the values passed as bound parameters, only ``conditions``
+        are applied on every call. ``columns`` select just those instead of
+        the model.
+        """
+        if order_by is None:
+            order_by = self.order_by if self.order_by is not None else []
+        order_by = list(order_by)
+        columns = tuple(columns) if columns else ()
+
+        def build(filters: dict[str, Any]) -> Select[tuple[ModelT]]:
+            statement = select(*columns) if columns else select(self.model)
+            statement = self._apply_order_by(statement=statement, order_by=order_by)
+            statement = self._apply_select_filters_by_kwargs(statement, **filters)
+            return self._apply_load_options(statement, load_options)
+
+        order_signature = self._get_order_by_signature(order_by)
+        statement, params = self._get_cached_statement(
+            key=("select", order_signature, columns, *kwargs),
+            build=build,
+            cacheable=order_signature is not None and not load_options,
+            **kwargs,
+        )
+        return self._apply_conditions(statement, conditions), params
+
+    def _get_count_statement(
+        self,
+        conditions: Optional[Iterable[ColumnElement[bool]]] = None,
+        **kwargs: Any,
+    ) -> tuple[Select[tuple[int]], dict[str, Any]]:
+        def build(filters: dict[str, Any]) -> Select[tuple[int]]:
+            statement = select(func.count()).select_from(self.model)
+            return self._apply_select_filters_by_kwargs(statement, **filters)
+
+        statement, params = self._get_cached_statement(
+            key=("count", *kwargs),
+            build=build,
+            **kwargs,
+        )
+        return self._apply_conditions(statement, conditions), params
+
+    def _get_cached_statement[SelectT: Select[Any]](
+        self,
+        key: tuple[Any, ...],
+        build: Callable[[dict[str, Any]], SelectT],
+        cacheable: bool = True,
+        **kwargs: Any,
+    ) -> tuple[SelectT, dict[str, Any]]:
+        # ``None`` compiles to ``IS NULL`` and relationship or expression
+        # comparisons are not plain values, none of them can be bound later
+        columns = self._get_mapper().columns
+        if not (cacheable and self.statement_cache_size) or any(
+            name not in columns or value is None or hasattr(value, "__clause_element__")
+            for name, value in kwargs.items()
+        ):
+            return build(kwargs), {}
+
+        params = {f"filter_by_{name}": value for name, value in kwargs.items()}
+        statement = self._statement_cache.get(key)
+        if statement is None:
+            statement = build({name: bindparam(f"filter_by_{name}") for name in kwargs})
+            if len(self._statement_cache) < self.statement_cache_size:
+                self._statement_cache[key] = statement
+        return cast("SelectT", statement), params
+
+    def _get_order_by_signature(
+        self,
+        order_by: Sequence[OrderByExpr],
+    ) -> Optional[tuple[Hashable, ...]]:
+        """Hashable description of plain column ordering, ``None`` for anything else."""
+        signature: List[Hashable] = []
+        for order_field in order_by:
+            if isinstance(order_field, InstrumentedAttribute):
+                signature.append((order_field.class_, order_field.key, None))
+                continue
+
+            element = getattr(order_field, "element", None)
+            if (
+                not isinstance(order_field, UnaryExpression)
+                or order_field.modifier not in (operators.asc_op, operators.desc_op)
+                or not isinstance(element, Column)
+            ):
+                return None
+            signature.append((element.table, element.key, order_field.modifier))
+        return tuple(signature)
+
+    @classmethod
+    def _get_class_error_messages(cls) -> ErrorMessages:
+        if cls._class_error_messages is None:
+            cls._class_error_messages = cls._get_error_messages(
+                default_messages=cls.error_messages,
+            )
+        return cls._class_error_messages
+
+    def _resolve_error_messages(
+        self,
+        error_messages: Optional[ErrorMessages | None] = None,
+    ) -> ErrorMessages:
+        """Repository error messages, merged anew only when a call overrides them."""
+        if not error_messages:
+            return cast("ErrorMessages", self.error_messages)
+
+        return self._get_error_messages(
+            error_messages=error_messages,
+            default_messages=self.error_messages,
+        )
+
+    def _get_mapper(self) -> Any:
+        return inspect(self.model)
+
+    def _get_columns(
+        self,
+        keys: Iterable[str | InstrumentedAttribute[Any]] | None,
+    ) -> List[Column[Any]]:
+        if not keys:
+            return []
+
+        columns = self._get_mapper().columns
+        return [columns[key if isinstance(key, str) else key.key] for key in keys]
+
+    def _get_table_columns(self) -> dict[str, Column[Any]]:
+        """Mapped table columns by key, without read-only SQL expression properties."""
+        return {
+            key: column
+            for key, column in self._get_mapper().columns.items()
+            if isinstance(column, Column)
+        }
+
+    def _get_upsert_update_columns(
+        self,
+        conflict_target: Sequence[Column[Any]],
+    ) -> List[Column[Any]]:
+        excluded = {column.key for column in conflict_target}
+        return [
+            column
+            for column in self._get_table_columns().values()
+            if column.key not in excluded and not column.primary_key
+            # insert-only defaults (created_at) keep the stored value
+            and not (column.default is not None and column.onupdate is None)
+            # generated columns are computed by the database
+            and column.computed is None
+        ]
+
+    def _get_insert_values(self, item: ModelT) -> dict[str, Any]:
+        """Column values of a transient instance with Python-side defaults applied.
+
+        Multi-row ``VALUES`` need the same keys in every row, so defaults are
+        resolved here instead of being left to the flush.
+        """
+        state = inspect(item)
+        values: dict[str, Any] = {}
+
+        for key, column in self._get_table_columns().items():
+            value = state.dict.get(key)
+
+            if value is None and column.default is not None:
+                if column.default.is_callable:
+                    value = column.default.arg(None)  # type: ignore[attr-defined]
+                elif column.default.is_scalar:
+                    value = column.default.arg  # type: ignore[attr-defined]
+            elif value is None and column.server_default is not None:
+                continue
+
+            values[key] = value
+        return values
+
+    def _get_keyset_columns(
+        self,
+        order_by: Iterable[OrderByExpr] | None = None,
+    ) -> List[KeysetColumn]:
+        if order_by is None:
+            order_by = self.order_by if self.order_by is not None else []
+
+        columns: List[KeysetColumn] = []
+        for order_field in order_by:
+            if isinstance(order_field, UnaryExpression):
+                key = getattr(order_field.element, "key", None)
+                if key is None or not hasattr(self.model, key):
+                    msg = "Keyset pagination supports ordering by mapped columns only"
+                    raise InvalidCursorError(msg)
+                columns.append(
+                    KeysetColumn(
+                        attribute=self._get_instrumented_attr(self.model, key),
+                        descending=order_field.modifier is operators.desc_op,
+                    )
+                )
+            else:
+                columns.append(KeysetColumn(attribute=order_field, descending=False))
+
+        id_attribute = self._get_instrumented_attr(self.model, self.id_attribute)
+        if all(column.key != id_attribute.key for column in columns):
+            columns.append(
+                KeysetColumn(
+                    attribute=id_attribute,
+                    descending=columns[-1].descending if columns else False,
+                )
+            )
+        return columns
+
+    @staticmethod
+    def _encode_keyset_cursor(
+        columns: Sequence[KeysetColumn],
+        item: Any,
+        direction: CursorDirection,
+    ) -> str:
+        values = [getattr(item, column.key) for column in columns]
+        return encode_cursor(columns, values, direction)
 
     @staticmethod
     def check_not_found(item_or_none: Optional[ModelT]) -> ModelT:
@@ -0,0 +1,139 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Literal, NamedTuple
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, and_, literal, or_, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from .exceptions import InvalidCursorError
+
+CursorDirection = Literal["next", "prev"]
+
+
+class KeysetColumn(NamedTuple):
+    attribute: InstrumentedAttribute[Any]
+    descending: bool
+
+    @property
+    def key(self) -> str:
+        return self.attribute.key
+
+    @property
+    def signature(self) -> str:
+        return f"{self.key}:{'desc' if self.descending else 'asc'}"
+
+
+class CursorPage[ModelT](NamedTuple):
+    items: Sequence[ModelT]
+    next_cursor: str | None
+    prev_cursor: str | None
+    total: int | None = None
+
+
+def encode_cursor(
+    columns: Sequence[KeysetColumn],
+    values: Sequence[Any],
+    direction: CursorDirection,
+) -> str:
+    payload = {
+        "d": direction,
+        "k": [column.signature for column in columns],
+        "v": [_dump_value(value) for value in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str,
+    columns: Sequence[KeysetColumn],
+) -> tuple[CursorDirection, list[Any]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        direction, signature, raw_values = payload["d"], payload["k"], payload["v"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as exc:
+        msg = "Malformed pagination cursor"
+        raise InvalidCursorError(msg) from exc
+
+    if direction not in ("next", "prev") or not isinstance(raw_values, list):
+        msg = "Malformed pagination cursor"
+        raise InvalidCursorError(msg)
+
+    if signature != [column.signature for column in columns] or len(raw_values) != len(
+        columns
+    ):
+        msg = "Pagination cursor does not match the requested ordering"
+        raise InvalidCursorError(msg)
+
+    try:
+        values = [
+            _load_value(value, column) for value, column in zip(raw_values, columns)
+        ]
+    except (ValueError, TypeError, ArithmeticError) as exc:
+        msg = "Malformed pagination cursor"
+        raise InvalidCursorError(msg) from exc
+
+    return direction, values
+
+
+def keyset_condition(
+    columns: Sequence[KeysetColumn],
+    values: Sequence[Any],
+    direction: CursorDirection,
+) -> ColumnElement[bool]:
+    """Rows strictly after (``next``) or before (``prev``) the cursor position."""
+    forward = direction == "next"
+
+    # uniform direction -> row value comparison, which Postgres serves
+    # straight from a matching composite index
+    if len({column.descending for column in columns}) == 1:
+        after = forward != columns[0].descending
+        lhs = tuple_(*(column.attribute for column in columns))
+        rhs = tuple_(
+            *(
+                literal(value, type_=column.attribute.type)
+                for column, value in zip(columns, values)
+            )
+        )
+        return lhs > rhs if after else lhs < rhs
+
+    clauses: list[ColumnElement[bool]] = []
+    for index, column in enumerate(columns):
+        after = forward != column.descending
+        prefix = [
+            columns[i].attribute == values[i]  # type: ignore[misc]
+            for i in range(index)
+        ]
+        compare = (
+            column.attribute > values[index]
+            if after
+            else column.attribute < values[index]
+        )
+        clauses.append(and_(*prefix, compare))
+    return or_(*clauses)
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def _load_value(value: Any, column: KeysetColumn) -> Any:
+    if value is None:
+        return None
+
+    python_type = column.attribute.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type in (Decimal, UUID):
+        return python_type(value)
+    return value
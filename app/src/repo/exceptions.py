@@ -7,7 +7,7 @@ operations while retaining the core functionality provided by advanced_alchemy.
 """
 
 import re
-from collections.abc import Callable, Generator
+from collections.abc import Callable, Generator, Sequence
 from contextlib import contextmanager
 from typing import Optional, TypedDict, cast
 
@@ -46,6 +46,29 @@ class MultipleResultsFoundError(RepositoryError):
     """
 
 
+class BulkOperationError(RepositoryError):
+    """Bulk operation error.
+
+    This exception is raised when rows of a bulk operation fail. None of the rows are written,
+    ``errors`` holds the index of every failed row with the error it raised.
+    """
+
+    def __init__(
+        self,
+        *args: object,
+        errors: Sequence[tuple[int, RepositoryError]] = (),
+    ) -> None:
+        super().__init__(*args)
+        self.errors = list(errors)
+
+
+class InvalidCursorError(RepositoryError):
+    """Invalid cursor error.
+
+    This exception is raised when a pagination cursor cannot be decoded or was issued for a different ordering.
+    """
+
+
 class InvalidRequestError(RepositoryError):
     """Invalid request error.
 
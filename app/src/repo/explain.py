@@ -0,0 +1,31 @@
+import json
+from typing import Any
+
+from sqlalchemy import ClauseElement, Executable
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` of a statement, executed with its parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Executable, analyze: bool = False) -> None:
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler: SQLCompiler, **kwargs: Any) -> str:
+    options = "ANALYZE, FORMAT JSON" if element.analyze else "FORMAT JSON"
+    return f"EXPLAIN ({options}) {compiler.process(element.statement, **kwargs)}"
+
+
+def load_plan(raw: Any) -> dict[str, Any]:
+    """Top plan node of an ``EXPLAIN (FORMAT JSON)`` result value.
+
+    asyncpg hands the ``json`` column over as text, other drivers decode it.
+    """
+    document = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+    return document[0]["Plan"]
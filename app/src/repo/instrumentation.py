@@ -0,0 +1,254 @@
+import hashlib
+import inspect
+import logging
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Callable, Sequence
+from contextvars import ContextVar, Token
+from functools import wraps
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional
+
+from sqlalchemy import Executable
+
+from .cursor import CursorPage
+
+if TYPE_CHECKING:
+    from src.cache import TTLCache
+
+    from .base import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+class RepositoryCallEvent(NamedTuple):
+    model: str
+    method: str
+    duration: float
+    """Wall time of the call in seconds."""
+    rows: int
+    fingerprint: Optional[str]
+    """Hash of the SQL the call executed, ``None`` when it only flushed."""
+    error: Optional[str] = None
+    """Exception class name when the call failed."""
+
+
+RepositoryObserver = Callable[[RepositoryCallEvent], None]
+
+_observers: list[RepositoryObserver] = []
+
+_statements: ContextVar[Optional[list[Executable]]] = ContextVar(
+    "repository_statements", default=None
+)
+
+
+def add_observer(observer: RepositoryObserver) -> None:
+    _observers.append(observer)
+
+
+def remove_observer(observer: RepositoryObserver) -> None:
+    _observers.remove(observer)
+
+
+_caches: dict[str, "TTLCache[Any, Any]"] = {}
+
+
+def register_cache(name: str, cache: "TTLCache[Any, Any]") -> None:
+    """Report the hits, misses and evictions of ``cache`` in ``cache_snapshot``."""
+    _caches[name] = cache
+
+
+def cache_snapshot() -> list[dict[str, Any]]:
+    return [
+        {"cache": name, **cache.stats()._asdict()} for name, cache in _caches.items()
+    ]
+
+
+def record_statement(statement: Executable) -> None:
+    statements = _statements.get()
+    if statements is not None:
+        statements.append(statement)
+
+
+def instrumented[F: Callable[..., Any]](method: F) -> F:
+    """Report every call of a repository method to the registered observers.
+
+    Nothing is measured while no observer is registered. A call made while
+    another instrumented call runs (``upsert`` calling ``upsert_many``, say) is
+    part of that call: its time and statements count there, it is not reported
+    on its own.
+    """
+    if inspect.isasyncgenfunction(method):
+
+        @wraps(method)
+        async def generator_wrapper(
+            self: "BaseRepository[Any]", *args: Any, **kwargs: Any
+        ) -> AsyncIterator[Any]:
+            if not _observers or _statements.get() is not None:
+                async for item in method(self, *args, **kwargs):
+                    yield item
+                return
+
+            rows = 0
+            duration = 0.0
+            statements: list[Executable] = []
+            error: Optional[BaseException] = None
+
+            # only the time spent inside the generator counts, not the caller's
+            # work between batches, which also must not record statements here
+            previous = _statements.set(statements).old_value
+            resumed = time.perf_counter()
+            try:
+                async for item in method(self, *args, **kwargs):
+                    duration += time.perf_counter() - resumed
+                    rows += _count_rows(item)
+
+                    _statements.set(_none_if_missing(previous))
+                    try:
+                        yield item
+                    finally:
+                        _statements.set(statements)
+                        resumed = time.perf_counter()
+            except Exception as exc:
+                error = exc
+                raise
+            finally:
+                duration += time.perf_counter() - resumed
+                _statements.set(_none_if_missing(previous))
+                _notify(self, method.__name__, duration, rows, statements, error)
+
+        return generator_wrapper  # type: ignore[return-value]
+
+    @wraps(method)
+    async def wrapper(self: "BaseRepository[Any]", *args: Any, **kwargs: Any) -> Any:
+        if not _observers or _statements.get() is not None:
+            return await method(self, *args, **kwargs)
+
+        statements: list[Executable] = []
+        token = _statements.set(statements)
+        started = time.perf_counter()
+        try:
+            result = await method(self, *args, **kwargs)
+        except Exception as exc:
+            duration = time.perf_counter() - started
+            _statements.reset(token)
+            _notify(self, method.__name__, duration, 0, statements, exc)
+            raise
+
+        duration = time.perf_counter() - started
+        _statements.reset(token)
+        _notify(self, method.__name__, duration, _count_rows(result), statements)
+        return result
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _none_if_missing(value: Any) -> Any:
+    return None if value is Token.MISSING else value
+
+
+def _notify(
+    repository: "BaseRepository[Any]",
+    method: str,
+    duration: float,
+    rows: int,
+    statements: Sequence[Executable],
+    error: Optional[BaseException] = None,
+) -> None:
+    event = RepositoryCallEvent(
+        model=repository.model.__name__,
+        method=method,
+        duration=duration,
+        rows=rows,
+        fingerprint=_fingerprint(repository, statements),
+        error=type(error).__name__ if error is not None else None,
+    )
+    for observer in list(_observers):
+        try:
+            observer(event)
+        except Exception:
+            logger.exception("Repository observer %r failed", observer)
+
+
+def _fingerprint(
+    repository: "BaseRepository[Any]",
+    statements: Sequence[Executable],
+) -> Optional[str]:
+    if not statements:
+        return None
+
+    dialect = repository.session.get_bind().dialect
+    sql = ";".join(str(statement.compile(dialect=dialect)) for statement in statements)
+    return hashlib.sha1(sql.encode()).hexdigest()[:16]
+
+
+def _count_rows(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, CursorPage):
+        return len(result.items)
+    if isinstance(result, tuple):
+        # list_and_count -> (items, total)
+        return len(result[0])
+    if isinstance(result, Sequence) and not isinstance(result, (str, bytes)):
+        return len(result)
+    return 1
+
+
+class MethodStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.fingerprints: Counter[str] = Counter()
+
+    @property
+    def avg_duration(self) -> float:
+        return self.total_duration / self.calls if self.calls else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_duration": self.total_duration,
+            "avg_duration": self.avg_duration,
+            "max_duration": self.max_duration,
+            "fingerprints": dict(self.fingerprints),
+        }
+
+
+class RepositoryStats:
+    """In-memory aggregate of repository calls per model and method.
+
+    Register an instance with ``add_observer``; ``snapshot`` lists the
+    methods by total time spent, the most expensive first.
+    """
+
+    def __init__(self) -> None:
+        self._stats: dict[tuple[str, str], MethodStats] = {}
+
+    def __call__(self, event: RepositoryCallEvent) -> None:
+        stats = self._stats.setdefault((event.model, event.method), MethodStats())
+        stats.calls += 1
+        stats.rows += event.rows
+        stats.total_duration += event.duration
+        stats.max_duration = max(stats.max_duration, event.duration)
+        if event.error is not None:
+            stats.errors += 1
+        if event.fingerprint is not None:
+            stats.fingerprints[event.fingerprint] += 1
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        return [
+            {"model": model, "method": method, **stats.as_dict()}
+            for (model, method), stats in sorted(
+                self._stats.items(),
+                key=lambda item: item[1].total_duration,
+                reverse=True,
+            )
+        ]
+
+    def reset(self) -> None:
+        self._stats.clear()
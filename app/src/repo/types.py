@@ -1,7 +1,7 @@
 from collections.abc import Iterable
 from typing import Any, TypeAlias, TypeVar, Union
 
-from sqlalchemy import Delete, Select, UnaryExpression, Update
+from sqlalchemy import ColumnElement, Delete, Select, UnaryExpression, Update
 from sqlalchemy.orm import InstrumentedAttribute, Load
 from sqlalchemy.sql.dml import ReturningDelete, ReturningUpdate
 
@@ -18,4 +18,5 @@ StatementTypeT = TypeVar(
 )
 
 OrderByExpr = Union[InstrumentedAttribute, UnaryExpression]
+SelectColumn = Union[InstrumentedAttribute, ColumnElement]
 LoadOptions: TypeAlias = Iterable["Load[Any]"]
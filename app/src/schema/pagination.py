@@ -1,4 +1,4 @@
-from typing import Generic, List, TypeVar
+from typing import Generic, List, Optional, Sequence, TypeVar
 
 from pydantic import BaseModel
 
@@ -6,12 +6,42 @@ T = TypeVar("T")
 
 
 class PageMeta(BaseModel):
-    total: int
-    page: int
+    total: Optional[int] = None
+    total_exact: bool = True
+    page: Optional[int] = None
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
 
 
 class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T]
     meta: PageMeta
+
+    @classmethod
+    def from_page(
+        cls,
+        items: Sequence[T],
+        *,
+        total: Optional[int],
+        page_size: int,
+        page: Optional[int] = None,
+        next_cursor: Optional[str] = None,
+        prev_cursor: Optional[str] = None,
+        total_exact: bool = True,
+    ) -> "PaginatedResponse[T]":
+        return cls(
+            items=list(items),
+            meta=PageMeta(
+                total=total,
+                total_exact=total is not None and total_exact,
+                page=page,
+                page_size=page_size,
+                total_pages=(
+                    (total + page_size - 1) // page_size if total is not None else None
+                ),
+                next_cursor=next_cursor,
+                prev_cursor=prev_cursor,
+            ),
+        )
@@ -1,3 +1,7 @@
-__all__ = ("BaseService",)
+__all__ = (
+    "BaseService",
+    "BatchLoader",
+)
 
 from .base import BaseService
+from .loader import BatchLoader
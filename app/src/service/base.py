@@ -1,5 +1,5 @@
 from functools import cached_property
-from typing import Any, List, cast
+from typing import Any, List, Sequence, cast
 from uuid import UUID
 
 from src.model import Base
@@ -30,6 +30,25 @@ class BaseService[
             auto_commit=True,
         )
 
+    async def add_many(
+        self,
+        data: List[CreateSchemaT],
+        chunk_size: int | None = None,
+    ) -> Sequence[ModelT]:
+        instances = [self.model(**item.model_dump()) for item in data]
+        return await self.repo.add_many(
+            instances,
+            chunk_size=chunk_size,
+            auto_commit=True,
+        )
+
+    async def upsert_many(self, data: List[CreateSchemaT]) -> Sequence[ModelT]:
+        instances = [self.model(**item.model_dump()) for item in data]
+        return await self.repo.upsert_many(
+            instances,
+            auto_commit=True,
+        )
+
     async def list(self) -> List[ModelT]:
         return await self.repo.list()
 
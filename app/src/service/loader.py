@@ -0,0 +1,75 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Iterable, Mapping, Sequence
+from typing import Optional
+
+
+class BatchLoader[KeyT: Hashable, ValueT]:
+    """Coalesces the ``load`` calls of one event loop tick into one ``batch_load``.
+
+    ``batch_load`` gets the distinct keys and returns the values it found by
+    key; a key it did not return loads as ``None``. Loads of a key whose batch
+    is still running share its result, nothing is remembered once a batch
+    resolved. One batch runs at a time, as they share a session; keys loaded
+    meanwhile make up the next one. Keep one loader per request, it must not
+    outlive the session ``batch_load`` works with.
+    """
+
+    def __init__(
+        self,
+        batch_load: Callable[[Sequence[KeyT]], Awaitable[Mapping[KeyT, ValueT]]],
+    ) -> None:
+        self._batch_load = batch_load
+        self._pending: dict[KeyT, asyncio.Future[Optional[ValueT]]] = {}
+        self._queue: list[KeyT] = []
+        self._running: Optional[asyncio.Task[None]] = None
+
+    def load(self, key: KeyT) -> asyncio.Future[Optional[ValueT]]:
+        # shielded, a cancelled caller must not cancel the load of the others
+        future = self._pending.get(key)
+        if future is not None:
+            return asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[key] = future
+
+        # the first key of a batch schedules the dispatch behind every callback
+        # that is already ready to run, so their loads join this batch
+        if not self._queue:
+            loop.call_soon(self._dispatch)
+        self._queue.append(key)
+        return asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[KeyT]) -> list[Optional[ValueT]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        # the queue waits for the running batch, its end dispatches it
+        if self._running is not None:
+            return
+        keys, self._queue = self._queue, []
+        self._running = asyncio.ensure_future(self._run(keys))
+        self._running.add_done_callback(self._dispatch_next)
+
+    def _dispatch_next(self, task: asyncio.Task[None]) -> None:
+        self._running = None
+        if self._queue:
+            self._dispatch()
+
+    async def _run(self, keys: list[KeyT]) -> None:
+        try:
+            values = await self._batch_load(keys)
+        except asyncio.CancelledError:
+            # the loads are cancelled with the batch, nothing is left waiting
+            for key in keys:
+                self._pending.pop(key).cancel()
+            raise
+        except BaseException as exc:
+            for key in keys:
+                self._pending.pop(key).set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+
+        for key in keys:
+            self._pending.pop(key).set_result(values.get(key))
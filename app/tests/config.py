@@ -20,3 +20,7 @@ class TestDatabaseConfig:
 
 
 test_db_config = TestDatabaseConfig()
+
+# the plan checks depend on the server's statistics and settings, so they only
+# run when asked for; benchmarks/query_plans.py is the hard check
+run_query_plans: bool = os.getenv("TEST_QUERY_PLANS", "false").lower() == "true"
@@ -3,7 +3,7 @@ from typing import AsyncGenerator
 import pytest_asyncio
 from asgi_lifespan import LifespanManager
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 from src.database import db_manager
 from src.database.manager import AsyncDatabaseManager
 from src.features.cart.model import Cart, CartItem
@@ -51,3 +51,14 @@ async def async_client():
             yield client
 
     app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def rollback_connection() -> AsyncGenerator[AsyncConnection, None]:
+    """Connection in a transaction that is rolled back, whatever it wrote."""
+    async with test_db_manager.engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            yield connection
+        finally:
+            await transaction.rollback()
@@ -0,0 +1,148 @@
+from uuid import uuid4
+
+import pytest
+from faker import Faker
+from httpx import AsyncClient
+
+fake = Faker()
+
+
+async def create_product(async_client: AsyncClient, price: float = 100) -> str:
+    payload = {"name": fake.unique.word(), "price": price, "category": "Test"}
+    response = await async_client.post("/api/v1/products/", json=payload)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_add_same_product_twice_merges_quantity(async_client: AsyncClient):
+    headers = {"X-Session-Id": uuid4().hex}
+    product_id = await create_product(async_client)
+
+    for quantity in (2, 3):
+        response = await async_client.post(
+            "/api/v1/carts/",
+            json={"productId": product_id, "quantity": quantity},
+            headers=headers,
+        )
+        assert response.status_code == 201
+
+    response = await async_client.get("/api/v1/carts/", headers=headers)
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [(item["product"]["id"], item["quantity"]) for item in items] == [
+        (product_id, 5)
+    ]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_add_missing_product_to_cart(async_client: AsyncClient):
+    headers = {"X-Session-Id": uuid4().hex}
+    response = await async_client.post(
+        "/api/v1/carts/",
+        json={"productId": str(uuid4()), "quantity": 1},
+        headers=headers,
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Product not found"
+
+    # no cart is created for the session either
+    response = await async_client.get("/api/v1/carts/", headers=headers)
+    assert response.json()["id"] is None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cart_items_are_scoped_to_their_cart(async_client: AsyncClient):
+    owner = {"X-Session-Id": uuid4().hex}
+    stranger = {"X-Session-Id": uuid4().hex}
+    product_id = await create_product(async_client)
+    await async_client.post(
+        "/api/v1/carts/",
+        json={"productId": product_id, "quantity": 1},
+        headers=owner,
+    )
+    item_id = (await async_client.get("/api/v1/carts/", headers=owner)).json()["items"][
+        0
+    ]["id"]
+
+    response = await async_client.patch(
+        f"/api/v1/carts/{item_id}/", json={"quantity": 7}, headers=stranger
+    )
+    assert response.status_code == 400
+    response = await async_client.delete(f"/api/v1/carts/{item_id}/", headers=stranger)
+    assert response.status_code == 400
+
+    response = await async_client.patch(
+        f"/api/v1/carts/{item_id}/", json={"quantity": 7}, headers=owner
+    )
+    assert response.status_code == 200
+    items = (await async_client.get("/api/v1/carts/", headers=owner)).json()["items"]
+    assert [item["quantity"] for item in items] == [7]
+
+    response = await async_client.delete(f"/api/v1/carts/{item_id}/", headers=owner)
+    assert response.status_code == 204
+    response = await async_client.delete(f"/api/v1/carts/{item_id}/", headers=owner)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Cart item not found"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_cart_without_items(async_client: AsyncClient):
+    headers = {"X-Session-Id": uuid4().hex}
+
+    for _ in range(2):
+        response = await async_client.get("/api/v1/carts/", headers=headers)
+        assert response.status_code == 200
+        # reading doesn't create the cart
+        assert response.json() == {
+            "id": None,
+            "sessionId": headers["X-Session-Id"],
+            "totalPrice": 0,
+            "items": [],
+        }
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_cart_total_price(async_client: AsyncClient):
+    headers = {"X-Session-Id": uuid4().hex}
+    for price, quantity in ((2.5, 2), (10, 3)):
+        product_id = await create_product(async_client, price=price)
+        await async_client.post(
+            "/api/v1/carts/",
+            json={"productId": product_id, "quantity": quantity},
+            headers=headers,
+        )
+
+    response = await async_client.get("/api/v1/carts/", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["id"] is not None
+    assert data["totalPrice"] == 35
+    assert len(data["items"]) == 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_cart_rendered_by_database(async_client: AsyncClient):
+    headers = {"X-Session-Id": uuid4().hex}
+
+    response = await async_client.get(
+        "/api/v1/carts/", params={"render": "database"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+
+    for price, quantity in ((2.5, 2), (10, 3)):
+        product_id = await create_product(async_client, price=price)
+        await async_client.post(
+            "/api/v1/carts/",
+            json={"productId": product_id, "quantity": quantity},
+            headers=headers,
+        )
+
+    python = await async_client.get("/api/v1/carts/", headers=headers)
+    database = await async_client.get(
+        "/api/v1/carts/", params={"render": "database"}, headers=headers
+    )
+    assert database.status_code == 200
+    assert database.headers["content-type"] == "application/json"
+    assert database.json() == python.json()
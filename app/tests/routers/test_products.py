@@ -1,3 +1,4 @@
+import json
 from uuid import uuid4
 
 import pytest
@@ -192,3 +193,384 @@ async def test_cant_get_product_with_invalid_uuid(async_client: AsyncClient):
     invalid_uuid = "123-invalid-uuid"
     response = await async_client.get(f"/api/v1/products/{invalid_uuid}")
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_products_by_cursor(async_client: AsyncClient):
+    category = uuid4().hex
+    products = [
+        {"name": fake.unique.word(), "price": price, "category": category}
+        for price in (300, 100, 200, 100, 500)
+    ]
+    response = await async_client.post("/api/v1/products/bulk", json=products)
+    assert response.status_code == 200
+
+    params = {"category": category, "sort_by": "price", "page_size": 2}
+    response = await async_client.get("/api/v1/products/", params=params)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["meta"]["total"] == 5
+    assert data["meta"]["prev_cursor"] is None
+
+    prices = [item["price"] for item in data["items"]]
+    cursor = data["meta"]["next_cursor"]
+    while cursor:
+        response = await async_client.get(
+            "/api/v1/products/", params={**params, "cursor": cursor}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        prices.extend(item["price"] for item in data["items"])
+        cursor = data["meta"]["next_cursor"]
+
+    assert prices == [100, 100, 200, 300, 500]
+
+    response = await async_client.get(
+        "/api/v1/products/",
+        params={**params, "cursor": data["meta"]["prev_cursor"]},
+    )
+    assert response.status_code == 200
+    assert [item["price"] for item in response.json()["items"]] == [200, 300]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cant_list_products_with_malformed_cursor(async_client: AsyncClient):
+    response = await async_client.get(
+        "/api/v1/products/", params={"cursor": "not-a-cursor"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_products_page_past_the_end_keeps_total(async_client: AsyncClient):
+    category = uuid4().hex
+    products = [
+        {"name": fake.unique.word(), "price": 100, "category": category}
+        for _ in range(3)
+    ]
+    response = await async_client.post("/api/v1/products/bulk", json=products)
+    assert response.status_code == 200
+
+    response = await async_client.get(
+        "/api/v1/products/",
+        params={"category": category, "page": 5, "page_size": 2},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["items"] == []
+    assert data["meta"]["total"] == 3
+    assert data["meta"]["total_pages"] == 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_upsert_products(async_client: AsyncClient):
+    existing = {"name": fake.unique.word(), "price": 100, "category": "Test"}
+    create_resp = await async_client.post("/api/v1/products/", json=existing)
+    assert create_resp.status_code == 200
+    existing_id = create_resp.json()["id"]
+
+    products = [
+        {**existing, "price": 150, "description": "updated"},
+        {"name": fake.unique.word(), "price": 200, "category": "Test"},
+    ]
+
+    response = await async_client.put("/api/v1/products/bulk", json=products)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 2
+
+    by_name = {product["name"]: product for product in data}
+    assert by_name[existing["name"]]["id"] == existing_id
+    assert by_name[existing["name"]]["price"] == 150
+    assert by_name[existing["name"]]["description"] == "updated"
+
+    get_resp = await async_client.get(f"/api/v1/products/{existing_id}")
+    assert get_resp.json()["price"] == 150
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_create_products_is_all_or_nothing(async_client: AsyncClient):
+    category = uuid4().hex
+    duplicate_name = fake.unique.word()
+    products = [
+        {"name": fake.unique.word(), "price": 100, "category": category},
+        {"name": duplicate_name, "price": 100, "category": category},
+        {"name": fake.unique.word(), "price": 100, "category": category},
+        {"name": duplicate_name, "price": 200, "category": category},
+    ]
+
+    response = await async_client.post(
+        "/api/v1/products/bulk", json=products, params={"chunk_size": 2}
+    )
+    assert response.status_code == 409
+    assert [error["index"] for error in response.json()["errors"]] == [3]
+
+    response = await async_client.get(
+        "/api/v1/products/", params={"category": category}
+    )
+    assert response.json()["meta"]["total"] == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_export_products(async_client: AsyncClient):
+    category = uuid4().hex
+    products = [
+        {"name": fake.unique.word(), "price": price, "category": category}
+        for price in (100, 200, 300)
+    ]
+    response = await async_client.post("/api/v1/products/bulk", json=products)
+    assert response.status_code == 200
+
+    response = await async_client.get(
+        "/api/v1/products/export",
+        params={"category": category, "price_from": 150},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(row["price"] for row in rows) == [200, 300]
+    keys = list(rows[0])
+
+    response = await async_client.get(
+        "/api/v1/products/export",
+        params={"category": category, "format": "csv"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0] == "id,name,description,price,image,category"
+    assert lines[0].split(",") == keys
+    assert len(lines) == 4
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_products_fulltext_search_ranks_name_matches_first(
+    async_client: AsyncClient,
+):
+    token = uuid4().hex
+    products = [
+        {"name": fake.unique.word(), "price": 100, "category": "Test"},
+        {
+            "name": fake.unique.word(),
+            "description": f"goes well with {token}",
+            "price": 100,
+            "category": "Test",
+        },
+        {"name": f"{token} {fake.unique.word()}", "price": 100, "category": "Test"},
+    ]
+    response = await async_client.post("/api/v1/products/bulk", json=products)
+    assert response.status_code == 200
+
+    response = await async_client.get(
+        "/api/v1/products/", params={"search": token, "search_mode": "fulltext"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["meta"]["total"] == 2
+    assert [item["name"] for item in data["items"]] == [
+        products[2]["name"],
+        products[1]["name"],
+    ]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_products_by_exact_and_fuzzy_category(async_client: AsyncClient):
+    category = f"kitchenware-{uuid4().hex[:8]}"
+    products = [
+        {"name": fake.unique.word(), "price": 100, "category": category},
+        {"name": fake.unique.word(), "price": 100, "category": f"{category}-sale"},
+    ]
+    response = await async_client.post("/api/v1/products/bulk", json=products)
+    assert response.status_code == 200
+
+    async def list_names(**params: str) -> list[str]:
+        response = await async_client.get("/api/v1/products/", params=params)
+        assert response.status_code == 200
+        return [item["name"] for item in response.json()["items"]]
+
+    assert len(await list_names(category=category)) == 2
+    assert await list_names(category=category, category_match="exact") == [
+        products[0]["name"]
+    ]
+
+    typo = category.replace("kitchenware", "kitchenwear")
+    assert await list_names(category=typo, category_match="exact") == []
+    assert products[0]["name"] in await list_names(
+        category=typo, category_match="fuzzy"
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_product_facets(async_client: AsyncClient):
+    category = uuid4().hex
+    # buckets are 10 wide from 10 to 50 and include their lower bound, 19 is
+    # in the first one and 20 would start the second
+    products = [
+        {"name": fake.unique.word(), "price": price, "category": f"{category}-{kind}"}
+        for price, kind in ((10, "a"), (19, "a"), (45, "a"), (50, "b"))
+    ]
+    response = await async_client.post("/api/v1/products/bulk", json=products)
+    assert response.status_code == 200
+
+    response = await async_client.get(
+        "/api/v1/products/facets", params={"category": category, "buckets": 4}
+    )
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["total"] == 4
+    assert data["minPrice"] == 10
+    assert data["maxPrice"] == 50
+    assert data["categories"] == [
+        {"category": f"{category}-a", "count": 3},
+        {"category": f"{category}-b", "count": 1},
+    ]
+    assert [bucket["count"] for bucket in data["priceHistogram"]] == [2, 0, 0, 2]
+    assert data["priceHistogram"][0] == {"minPrice": 10, "maxPrice": 20, "count": 2}
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_products_total_modes(async_client: AsyncClient):
+    category = uuid4().hex
+    products = [
+        {"name": fake.unique.word(), "price": 100, "category": category}
+        for _ in range(3)
+    ]
+    response = await async_client.post("/api/v1/products/bulk", json=products)
+    assert response.status_code == 200
+
+    params = {"category": category, "page_size": 2}
+
+    # a small estimate is replaced with an exact count
+    response = await async_client.get(
+        "/api/v1/products/", params={**params, "total_mode": "estimate"}
+    )
+    assert response.status_code == 200
+    meta = response.json()["meta"]
+    assert meta["total"] == 3
+    assert meta["total_exact"] is True
+    assert meta["next_cursor"] is not None
+
+    response = await async_client.get(
+        "/api/v1/products/", params={**params, "total_mode": "none"}
+    )
+    assert response.status_code == 200
+    meta = response.json()["meta"]
+    assert meta["total"] is None
+    assert meta["total_pages"] is None
+    assert meta["total_exact"] is False
+    assert meta["next_cursor"] is not None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_product_sees_upsert_after_being_cached(async_client: AsyncClient):
+    product = {"name": fake.unique.word(), "price": 100, "category": "Test"}
+    create_resp = await async_client.post("/api/v1/products/", json=product)
+    assert create_resp.status_code == 200
+    product_id = create_resp.json()["id"]
+
+    for _ in range(2):
+        get_resp = await async_client.get(f"/api/v1/products/{product_id}")
+        assert get_resp.json()["price"] == 100
+
+    response = await async_client.put(
+        "/api/v1/products/bulk", json=[{**product, "price": 250}]
+    )
+    assert response.status_code == 200
+
+    get_resp = await async_client.get(f"/api/v1/products/{product_id}")
+    assert get_resp.json()["price"] == 250
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_product_conditional_request(async_client: AsyncClient):
+    payload = {"name": fake.unique.word(), "price": 100, "category": "Test"}
+    create_resp = await async_client.post("/api/v1/products/", json=payload)
+    product_id = create_resp.json()["id"]
+
+    response = await async_client.get(f"/api/v1/products/{product_id}")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert "last-modified" in response.headers
+    assert "cache-control" in response.headers
+
+    response = await async_client.get(
+        f"/api/v1/products/{product_id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = await async_client.put(
+        "/api/v1/products/bulk", json=[{**payload, "price": 150}]
+    )
+    assert response.status_code == 200
+
+    response = await async_client.get(
+        f"/api/v1/products/{product_id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_products_conditional_request(async_client: AsyncClient):
+    response = await async_client.get("/api/v1/products/")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    # a deleted product doesn't change the newest update time on the page
+    assert "last-modified" not in response.headers
+
+    response = await async_client.get(
+        "/api/v1/products/", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    response = await async_client.get(
+        "/api/v1/products/",
+        headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"},
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_lookup_products(async_client: AsyncClient):
+    products = [
+        {"name": fake.unique.word(), "price": 100 + i, "category": "Test"}
+        for i in range(3)
+    ]
+    create_resp = await async_client.post("/api/v1/products/bulk", json=products)
+    ids = [item["id"] for item in create_resp.json()]
+
+    missing_id = str(uuid4())
+    response = await async_client.post(
+        "/api/v1/products/lookup",
+        json={"ids": [ids[2], missing_id, ids[0], ids[2]]},
+    )
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [ids[2], ids[0], ids[2]]
+
+    response = await async_client.post("/api/v1/products/lookup", json={"ids": []})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_products_share_category_by_slug(async_client: AsyncClient):
+    suffix = uuid4().hex[:8]
+    category = f"Garden & Patio {suffix}"
+    products = [
+        {"name": fake.unique.word(), "price": 100, "category": category},
+        {"name": fake.unique.word(), "price": 100, "category": category.lower()},
+    ]
+    response = await async_client.post("/api/v1/products/bulk", json=products)
+    assert response.status_code == 200
+    assert [item["category"] for item in response.json()] == [category, category]
+
+    response = await async_client.get(
+        "/api/v1/products/",
+        params={"category": f"garden-patio-{suffix}", "category_match": "exact"},
+    )
+    assert response.status_code == 200
+    assert {item["name"] for item in response.json()["items"]} == {
+        product["name"] for product in products
+    }
@@ -0,0 +1,110 @@
+from uuid import UUID, uuid4
+
+import pytest
+from faker import Faker
+from httpx import AsyncClient
+from src.features.cart.repo import CartRepository
+from src.features.cart.store import CartLine, HotCart, MemoryCartStore
+from src.repo.exceptions import IntegrityError, NotFoundError
+from tests.conftest import test_db_manager
+
+fake = Faker()
+
+
+async def create_product(async_client: AsyncClient) -> UUID:
+    payload = {"name": fake.unique.word(), "price": 10, "category": "Test"}
+    response = await async_client.post("/api/v1/products/", json=payload)
+    return UUID(response.json()["id"])
+
+
+async def stored_quantities(session_id: str) -> list[int]:
+    async with test_db_manager.session_factory() as session:
+        rows = await CartRepository(session=session).list_lines([session_id])
+    return sorted(row.quantity for row in rows if row.item_id is not None)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_memory_cart_store_writes_behind(async_client: AsyncClient):
+    product_id = await create_product(async_client)
+    first, second = uuid4().hex, uuid4().hex
+
+    # a long interval, only eviction and dispose write
+    store = MemoryCartStore(max_carts=1, flush_interval=3600, flush_batch_size=10)
+    store.initialize(test_db_manager.session_factory)
+    try:
+        await store.add_item(first, product_id, 2)
+        await store.add_item(first, product_id, 3)
+        cart = await store.get_cart(first)
+        assert [item.quantity for item in cart.items] == [5]
+        assert cart.total_price == 50
+        assert await stored_quantities(first) == []
+
+        # the second cart evicts the first, which is written on the way out
+        await store.add_item(second, product_id, 1)
+        assert len(store) == 1
+        assert await stored_quantities(first) == [5]
+        assert await stored_quantities(second) == []
+
+        # read back from the database, the first cart evicts the second
+        cart = await store.get_cart(first)
+        assert [item.quantity for item in cart.items] == [5]
+        assert await stored_quantities(second) == [1]
+
+        item_id = cart.items[0].id
+        assert await store.update_item(second, item_id, 1) is None
+        await store.update_item(first, item_id, 4)
+    finally:
+        await store.dispose()
+
+    assert await stored_quantities(first) == [4]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_memory_cart_store_item_ownership(async_client: AsyncClient):
+    first_product = await create_product(async_client)
+    second_product = await create_product(async_client)
+    owner, stranger = uuid4().hex, uuid4().hex
+
+    store = MemoryCartStore(max_carts=10, flush_interval=3600, flush_batch_size=10)
+    store.initialize(test_db_manager.session_factory)
+    try:
+        # reading a session without a cart holds nothing
+        assert (await store.get_cart(stranger)).id is None
+        assert len(store) == 0
+
+        stored = await store.add_item(owner, first_product, 1)
+        await store.flush()
+        # deleted in memory only, the database still has it
+        await store.delete_item(owner, stored.id)
+        for session_id in (owner, stranger):
+            with pytest.raises(NotFoundError):
+                await store.update_item(session_id, stored.id, 2)
+
+        # not written yet, but another session's item all the same
+        unwritten = await store.add_item(owner, second_product, 1)
+        assert await store.delete_item(stranger, unwritten.id) is None
+    finally:
+        await store.dispose()
+
+    assert await stored_quantities(owner) == [1]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_memory_cart_store_long_session_id(async_client: AsyncClient):
+    product_id = await create_product(async_client)
+    too_long, stored = "x" * 51, uuid4().hex
+
+    store = MemoryCartStore(max_carts=10, flush_interval=3600, flush_batch_size=10)
+    store.initialize(test_db_manager.session_factory)
+    try:
+        with pytest.raises(IntegrityError):
+            await store.add_item(too_long, product_id, 1)
+        assert len(store) == 0
+
+        # a cart the database rejects doesn't keep the others from being written
+        await store.add_item(stored, product_id, 1)
+        store._changed(HotCart(too_long), CartLine(uuid4(), product_id, 1))
+        assert await store.flush() is False
+        assert await stored_quantities(stored) == [1]
+    finally:
+        await store.dispose()
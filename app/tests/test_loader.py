@@ -0,0 +1,33 @@
+import asyncio
+from typing import Sequence
+
+import pytest
+from src.service import BatchLoader
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_batch_loader_runs_one_batch_at_a_time():
+    running = 0
+    batches: list[list[int]] = []
+
+    async def batch_load(keys: Sequence[int]) -> dict[int, int]:
+        nonlocal running
+        running += 1
+        assert running == 1, "batches overlap on the session"
+        batches.append(list(keys))
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {key: key * 10 for key in keys}
+
+    loader: BatchLoader[int, int] = BatchLoader(batch_load)
+
+    async def load_after(key: int, delay: float) -> int | None:
+        await asyncio.sleep(delay)
+        return await loader.load(key)
+
+    # the later loads come in while the first batch runs
+    values = await asyncio.gather(
+        load_after(1, 0), load_after(2, 0.002), load_after(3, 0.004)
+    )
+    assert values == [10, 20, 30]
+    assert batches == [[1], [2, 3]]
@@ -0,0 +1,17 @@
+import pytest
+from benchmarks.query_plans import explain_cases, format_report, seed_catalog
+from sqlalchemy.ext.asyncio import AsyncConnection
+from tests.config import run_query_plans
+
+ROWS = 20_000
+
+
+@pytest.mark.skipif(not run_query_plans, reason="TEST_QUERY_PLANS is not set")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_product_list_query_plans(rollback_connection: AsyncConnection):
+    await seed_catalog(rollback_connection, ROWS)
+
+    results = await explain_cases(rollback_connection)
+
+    failed = [result for result in results if result.failures]
+    assert not failed, format_report(failed)